@@ -1,4 +1,4 @@
-import { IInsertDocumentDbInput, IInsertDocumentDbOutput, IInsertDocumentTextDbInput, IResolvePaRequestDbOutput, IUpdatePARequestById } from "./types/types";
+import { IInsertDocumentDbInput, IInsertDocumentDbOutput, IInsertDocumentTextDbInput, IInsertDocumentWithOutboxJobDbInput, IResolvePaRequestDbOutput, IUpdatePARequestById } from "./types/types";
 import db from '../config/postgres';
 
 export default class DocumentsDb {
@@ -70,6 +70,79 @@ export default class DocumentsDb {
     );
   };
 
+  // Document, PHI text and processing job are committed together, so a job
+  // exists if and only if its document does (no Postgres/Redis dual write)
+  protected insertDocumentWithOutboxJob = async (
+    params: IInsertDocumentWithOutboxJobDbInput
+  ): Promise<IInsertDocumentDbOutput> => {
+    const {
+      pa_request_id,
+      idempotency_key,
+      status,
+      created_by,
+      text,
+      job_uuid,
+      request_uuid,
+    } = params;
+
+    const client = await db.getClient();
+
+    try {
+      await client.query("BEGIN");
+
+      const result = await client.query(
+        `
+        INSERT INTO core.documents
+          (pa_request_id, idempotency_key, status, created_by, modified_by)
+        VALUES
+          ($1, $2, $3, $4, $4)
+        RETURNING id, document_uuid
+        `,
+        [pa_request_id, idempotency_key, status, created_by]
+      );
+      const document = result.rows[0];
+
+      await client.query(
+        `
+        INSERT INTO phi.document_text
+          (document_id, text, created_by, modified_by)
+        VALUES
+          ($1, $2, $3, $3)
+        `,
+        [document.id, text, created_by]
+      );
+
+      await client.query(
+        `
+        INSERT INTO core.job_outbox
+          (job_uuid, payload, created_by, modified_by)
+        VALUES
+          ($1, $2, $3, $3)
+        `,
+        [
+          job_uuid,
+          JSON.stringify({
+            job_uuid,
+            document_id: document.id,
+            document_uuid: document.document_uuid,
+            pa_request_id,
+            request_uuid,
+            enqueued_at: Date.now() / 1000,
+          }),
+          created_by,
+        ]
+      );
+
+      await client.query("COMMIT");
+      return document;
+    } catch (error) {
+      await client.query("ROLLBACK");
+      throw error;
+    } finally {
+      client.release();
+    }
+  };
+
   protected updatePARequestById = async (obj: IUpdatePARequestById) => {
     const {pa_request_id, ...rest} = obj;
     const query = db.format(
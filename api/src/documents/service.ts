@@ -4,11 +4,14 @@ import ErrorHandler from "../utils/error.handler";
 import DocumentsHelper from "./helper";
 import { DocumentStatusEnum } from "./types/enums";
 import {
+  IInsertDocumentDbOutput,
   IUploadDocumentServiceInput,
   IUploadDocumentServiceOutput,
 } from "./types/types";
 import { AuditAction, PaRequestStatusEnum } from "../pa-requests/types/enums";
 import AuditHelper from "../audit/helper";
+import { QUEUE } from "../utils/constants";
+import { encodeJob } from "../utils/job.codec";
 
 export default class DocumentService extends DocumentsHelper {
   paAuditHelper: AuditHelper;
@@ -53,20 +56,36 @@ export default class DocumentService extends DocumentsHelper {
       };
     }
 
-    // 3️⃣ Create document metadata
-    const document = await this.insertDocument({
-      pa_request_id: paRequest.id,
-      idempotency_key,
-      status: this.getInitialStatus(),
-      created_by: actor,
-    });
+    const jobUuid = this.generateJobUuid();
+    const useOutbox = QUEUE.BACKEND === "postgres";
 
-    // 4️⃣ Insert PHI text
-    await this.insertDocumentText({
-      document_id: document.id,
-      text: document_text,
-      created_by: actor,
-    });
+    // 3️⃣ Create document metadata + 4️⃣ Insert PHI text
+    let document: IInsertDocumentDbOutput;
+    if (useOutbox) {
+      // Outbox backend: the job row is committed with the document
+      document = await this.insertDocumentWithOutboxJob({
+        pa_request_id: paRequest.id,
+        idempotency_key,
+        status: this.getInitialStatus(),
+        created_by: actor,
+        text: document_text,
+        job_uuid: jobUuid,
+        request_uuid,
+      });
+    } else {
+      document = await this.insertDocument({
+        pa_request_id: paRequest.id,
+        idempotency_key,
+        status: this.getInitialStatus(),
+        created_by: actor,
+      });
+
+      await this.insertDocumentText({
+        document_id: document.id,
+        text: document_text,
+        created_by: actor,
+      });
+    }
 
     await this.updatePARequestById({
       pa_request_id: paRequest.id,
@@ -85,15 +104,18 @@ export default class DocumentService extends DocumentsHelper {
     });
 
     // 5️⃣ Publish async job
-    const jobPayload = {
-      job_uuid: this.generateJobUuid(),
-      document_id: document.id,
-      document_uuid: document.document_uuid,
-      pa_request_id: paRequest.id,
-      request_uuid,
-    };
+    if (!useOutbox) {
+      const jobPayload = {
+        job_uuid: jobUuid,
+        document_id: document.id,
+        document_uuid: document.document_uuid,
+        pa_request_id: paRequest.id,
+        request_uuid,
+        enqueued_at: Date.now() / 1000,
+      };
 
-    await redis.lpush("document_processing_queue", JSON.stringify(jobPayload));
+      await redis.lpush(QUEUE.NAME, encodeJob(jobPayload));
+    }
 
     return {
       document_id: document.document_uuid,
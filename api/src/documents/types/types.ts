@@ -35,6 +35,12 @@ export type IInsertDocumentTextDbInput = {
   created_by: string;
 };
 
+export type IInsertDocumentWithOutboxJobDbInput = IInsertDocumentDbInput & {
+  text: string;
+  job_uuid: string;
+  request_uuid: string;
+};
+
 export type IDocumentProcessingJobPayload = {
   job_uuid: string;
   document_id: number;
@@ -6,4 +6,10 @@ export const REQUESTS = {
 export const ERROR_MESSAGE = {
     UNAUTHORIZED: 'User is not Unauthorized',
     PA_REQUEST_NOT_FOUND: 'Pa request not found'
-}
\ No newline at end of file
+}
+
+export const QUEUE = {
+    BACKEND: process.env.QUEUE_BACKEND || 'redis',
+    NAME: process.env.QUEUE_NAME || 'document_processing_queue',
+    PAYLOAD_FORMAT: process.env.JOB_PAYLOAD_FORMAT || 'json'
+}
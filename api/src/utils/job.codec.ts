@@ -0,0 +1,123 @@
+import { QUEUE } from "./constants";
+
+// Mirrors worker/app/queues/codec.py: framed payloads are 0xC1 (a byte
+// msgpack never emits and that never starts a JSON document), the schema
+// version, then the msgpack body. JSON stays the default so workers that
+// predate the codec keep reading the queue.
+const MAGIC = 0xc1;
+const SCHEMA_VERSION = 1;
+
+export const encodeJob = (job: Record<string, unknown>): string | Buffer => {
+  if (QUEUE.PAYLOAD_FORMAT !== "msgpack") {
+    return JSON.stringify(job);
+  }
+
+  const chunks: Buffer[] = [Buffer.from([MAGIC, SCHEMA_VERSION])];
+  packValue(job, chunks);
+  return Buffer.concat(chunks);
+};
+
+// Job payloads only carry JSON-shaped values, so this covers nil, booleans,
+// numbers, strings, arrays and maps
+const packValue = (value: unknown, chunks: Buffer[]): void => {
+  if (value === null || value === undefined) {
+    chunks.push(Buffer.from([0xc0]));
+  } else if (typeof value === "boolean") {
+    chunks.push(Buffer.from([value ? 0xc3 : 0xc2]));
+  } else if (typeof value === "number") {
+    packNumber(value, chunks);
+  } else if (typeof value === "string") {
+    packString(value, chunks);
+  } else if (Array.isArray(value)) {
+    packHeader(value.length, 0x90, 0xdc, 0xdd, chunks);
+    value.forEach((item) => packValue(item, chunks));
+  } else if (typeof value === "object") {
+    const entries = Object.entries(value as Record<string, unknown>).filter(
+      ([, item]) => item !== undefined
+    );
+    packHeader(entries.length, 0x80, 0xde, 0xdf, chunks);
+    entries.forEach(([key, item]) => {
+      packString(key, chunks);
+      packValue(item, chunks);
+    });
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} in a job payload`);
+  }
+};
+
+const packNumber = (value: number, chunks: Buffer[]): void => {
+  if (Number.isInteger(value) && value >= 0 && value <= 0xffffffff) {
+    if (value < 0x80) {
+      chunks.push(Buffer.from([value]));
+    } else {
+      const buf = Buffer.alloc(5);
+      buf[0] = 0xce;
+      buf.writeUInt32BE(value, 1);
+      chunks.push(buf);
+    }
+  } else if (Number.isInteger(value) && value < 0 && value >= -0x80000000) {
+    const buf = Buffer.alloc(5);
+    buf[0] = 0xd2;
+    buf.writeInt32BE(value, 1);
+    chunks.push(buf);
+  } else if (Number.isSafeInteger(value)) {
+    const buf = Buffer.alloc(9);
+    // uint64 / int64 as two 32-bit halves (two's complement when negative)
+    const high = Math.floor(value / 0x100000000);
+    buf[0] = value >= 0 ? 0xcf : 0xd3;
+    if (value >= 0) {
+      buf.writeUInt32BE(high, 1);
+    } else {
+      buf.writeInt32BE(high, 1);
+    }
+    buf.writeUInt32BE(value - high * 0x100000000, 5);
+    chunks.push(buf);
+  } else {
+    const buf = Buffer.alloc(9);
+    buf[0] = 0xcb;
+    buf.writeDoubleBE(value, 1);
+    chunks.push(buf);
+  }
+};
+
+const packString = (value: string, chunks: Buffer[]): void => {
+  const body = Buffer.from(value, "utf8");
+  if (body.length < 32) {
+    chunks.push(Buffer.from([0xa0 | body.length]));
+  } else if (body.length < 0x100) {
+    chunks.push(Buffer.from([0xd9, body.length]));
+  } else if (body.length < 0x10000) {
+    const buf = Buffer.alloc(3);
+    buf[0] = 0xda;
+    buf.writeUInt16BE(body.length, 1);
+    chunks.push(buf);
+  } else {
+    const buf = Buffer.alloc(5);
+    buf[0] = 0xdb;
+    buf.writeUInt32BE(body.length, 1);
+    chunks.push(buf);
+  }
+  chunks.push(body);
+};
+
+const packHeader = (
+  length: number,
+  fix: number,
+  marker16: number,
+  marker32: number,
+  chunks: Buffer[]
+): void => {
+  if (length < 16) {
+    chunks.push(Buffer.from([fix | length]));
+  } else if (length < 0x10000) {
+    const buf = Buffer.alloc(3);
+    buf[0] = marker16;
+    buf.writeUInt16BE(length, 1);
+    chunks.push(buf);
+  } else {
+    const buf = Buffer.alloc(5);
+    buf[0] = marker32;
+    buf.writeUInt32BE(length, 1);
+    chunks.push(buf);
+  }
+};
@@ -16,7 +16,7 @@ CREATE EXTENSION IF NOT EXISTS "pgcrypto";
 -- =========================
 -- CORE: PA REQUESTS
 -- =========================
-CREATE TABLE core.pa_requests (
+CREATE TABLE IF NOT EXISTS core.pa_requests (
   id            SERIAL PRIMARY KEY,                         -- internal PK
   request_uuid  UUID NOT NULL DEFAULT gen_random_uuid(),    -- external/public ID
   status        VARCHAR(32) NOT NULL,
@@ -30,7 +30,7 @@ CREATE TABLE core.pa_requests (
 -- =========================
 -- CORE: DOCUMENTS
 -- =========================
-CREATE TABLE core.documents (
+CREATE TABLE IF NOT EXISTS core.documents (
   id               SERIAL PRIMARY KEY,
   document_uuid  UUID NOT NULL DEFAULT gen_random_uuid(),    -- external/public ID
   pa_request_id    INTEGER NOT NULL
@@ -50,7 +50,7 @@ CREATE TABLE core.documents (
 -- =========================
 -- CORE: PROCESSING JOBS
 -- =========================
-CREATE TABLE core.processing_jobs (
+CREATE TABLE IF NOT EXISTS core.processing_jobs (
   id             SERIAL PRIMARY KEY,
   job_uuid       UUID NOT NULL UNIQUE,
   document_id    INTEGER NOT NULL
@@ -70,7 +70,7 @@ CREATE TABLE core.processing_jobs (
 -- =========================
 -- CORE: DEAD LETTER JOBS
 -- =========================
-CREATE TABLE core.dead_letter_jobs (
+CREATE TABLE IF NOT EXISTS core.dead_letter_jobs (
   id           SERIAL PRIMARY KEY,
   job_uuid     UUID NOT NULL,
   document_id  INTEGER,
@@ -82,10 +82,47 @@ CREATE TABLE core.dead_letter_jobs (
   modified_by  VARCHAR(128) NOT NULL
 );
 
+-- =========================
+-- CORE: JOB OUTBOX
+-- =========================
+-- Written in the same transaction as the document when QUEUE_BACKEND=postgres
+CREATE TABLE IF NOT EXISTS core.job_outbox (
+  id            BIGSERIAL PRIMARY KEY,
+  job_uuid      UUID NOT NULL UNIQUE,
+
+  payload       JSONB NOT NULL,
+  status        VARCHAR(32) NOT NULL DEFAULT 'pending',
+  attempt       INTEGER NOT NULL DEFAULT 1,
+  last_error    TEXT,
+
+  claimed_by    VARCHAR(128),
+  claimed_at    TIMESTAMP,
+  available_at  TIMESTAMP NOT NULL DEFAULT NOW(),
+
+  created_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+  modified_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+  created_by    VARCHAR(128) NOT NULL,
+  modified_by   VARCHAR(128) NOT NULL
+);
+
+-- Wakes listening workers once per inserting statement; delivered on commit.
+-- The channel name is fixed in worker/app/queues/postgres_queue.py.
+CREATE OR REPLACE FUNCTION core.notify_job_outbox() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('job_outbox', '');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_job_outbox_notify
+  AFTER INSERT ON core.job_outbox
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION core.notify_job_outbox();
+
 -- =========================
 -- CORE: EVIDENCE PACKS
 -- =========================
-CREATE TABLE core.evidence_packs (
+CREATE TABLE IF NOT EXISTS core.evidence_packs (
   id             SERIAL PRIMARY KEY,
   pa_request_id  INTEGER NOT NULL UNIQUE
                    REFERENCES core.pa_requests(id)
@@ -101,10 +138,15 @@ CREATE TABLE core.evidence_packs (
   modified_by    VARCHAR(128) NOT NULL
 );
 
+-- Added after the first release; ALTER so existing databases pick them up
+ALTER TABLE core.evidence_packs
+  ADD COLUMN IF NOT EXISTS criteria_state JSONB NOT NULL DEFAULT '{}'::jsonb,  -- per-document criterion evidence
+  ADD COLUMN IF NOT EXISTS state_version  INTEGER NOT NULL DEFAULT 0;
+
 -- =========================
 -- CORE: AUDIT LOGS
 -- =========================
-CREATE TABLE core.audit_logs (
+CREATE TABLE IF NOT EXISTS core.audit_logs (
   id            SERIAL PRIMARY KEY,
   pa_request_id INTEGER
                   REFERENCES core.pa_requests(id)
@@ -121,7 +163,7 @@ CREATE TABLE core.audit_logs (
 -- =========================
 -- PHI: DOCUMENT TEXT
 -- =========================
-CREATE TABLE phi.document_text (
+CREATE TABLE IF NOT EXISTS phi.document_text (
   id           SERIAL PRIMARY KEY,
   document_id  INTEGER NOT NULL
                  REFERENCES core.documents(id)
@@ -136,12 +178,15 @@ CREATE TABLE phi.document_text (
 -- =========================
 -- PHI: EXTRACTED EVIDENCE
 -- =========================
-CREATE TABLE phi.extracted_evidence (
+CREATE TABLE IF NOT EXISTS phi.extracted_evidence (
   id                    SERIAL PRIMARY KEY,
 
   evidence_pack_id      INTEGER NOT NULL
                            REFERENCES core.evidence_packs(id)
                            ON DELETE CASCADE,
+  document_id           INTEGER NOT NULL
+                           REFERENCES core.documents(id)
+                           ON DELETE CASCADE,
 
   diagnosis             VARCHAR(255),
   imaging_present       BOOLEAN,
@@ -156,20 +201,36 @@ CREATE TABLE phi.extracted_evidence (
   modified_by           VARCHAR(128) NOT NULL
 );
 
+-- Existing databases get document_id without NOT NULL: rows written before
+-- it have no document, and the worker always sets it from here on
+ALTER TABLE phi.extracted_evidence
+  ADD COLUMN IF NOT EXISTS document_id INTEGER
+    REFERENCES core.documents(id)
+    ON DELETE CASCADE;
+
 
 -- =========================
 -- INDEXES
 -- =========================
-CREATE INDEX idx_documents_pa_request_id
+CREATE INDEX IF NOT EXISTS idx_documents_pa_request_id
   ON core.documents(pa_request_id);
 
-CREATE INDEX idx_processing_jobs_document_id
+CREATE INDEX IF NOT EXISTS idx_processing_jobs_document_id
   ON core.processing_jobs(document_id);
 
-CREATE INDEX idx_audit_logs_pa_request_id
+CREATE INDEX IF NOT EXISTS idx_audit_logs_pa_request_id
   ON core.audit_logs(pa_request_id);
 
-CREATE INDEX idx_extracted_evidence_document_id
+CREATE INDEX IF NOT EXISTS idx_extracted_evidence_document_id
   ON phi.extracted_evidence(document_id);
 
+CREATE INDEX IF NOT EXISTS idx_job_outbox_pending
+  ON core.job_outbox(id)
+  WHERE status = 'pending';
+
+-- Claims take the pending jobs of one PA request at a time
+CREATE INDEX IF NOT EXISTS idx_job_outbox_pending_pa_request
+  ON core.job_outbox((payload->'pa_request_id'), id)
+  WHERE status = 'pending';
+
 COMMIT;
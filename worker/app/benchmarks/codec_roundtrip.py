@@ -0,0 +1,58 @@
+import argparse
+import time
+import uuid
+
+from app.queues import codec
+
+# Run with: python -m app.benchmarks.codec_roundtrip --iterations 200000
+
+
+def sample_job() -> dict:
+    return {
+        "job_uuid": str(uuid.uuid4()),
+        "document_id": 184467,
+        "document_uuid": str(uuid.uuid4()),
+        "pa_request_id": 52311,
+        "request_uuid": str(uuid.uuid4()),
+        "attempt": 2,
+    }
+
+
+def run(payload_format: str, job: dict, iterations: int) -> dict:
+    payload = codec.encode(job, payload_format)
+    assert codec.decode(payload) == job
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(job, payload_format)
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(payload)
+    decode_s = time.perf_counter() - start
+
+    return {
+        "format": payload_format,
+        "bytes": len(payload),
+        "encode_us": encode_s / iterations * 1e6,
+        "decode_us": decode_s / iterations * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Job payload codec round-trip benchmark")
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    job = sample_job()
+    for payload_format in ("json", "msgpack"):
+        result = run(payload_format, job, args.iterations)
+        print(
+            f"{result['format']:>8}: {result['bytes']:4d} bytes  "
+            f"encode {result['encode_us']:.2f}us  decode {result['decode_us']:.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
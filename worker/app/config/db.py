@@ -1,14 +1,144 @@
+import math
 import os
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+from app.utils import deadline
+from app.utils.db_metrics import InstrumentedCursor, record_connection
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 5))
+# 0 leaves connects unbounded outside a job deadline
+DB_CONNECT_TIMEOUT_SECONDS = int(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", 10))
+
+_pool: ThreadedConnectionPool | None = None
+_pool_pid: int | None = None
+
+
+def _connect_timeout() -> int:
+    # Capped by the job's remaining budget, so an unreachable database
+    # can't stall a job past its deadline in connect()
+    deadline.check("database connect")
+    left = deadline.remaining()
+    if left is None:
+        return DB_CONNECT_TIMEOUT_SECONDS
+
+    timeout = max(1, math.ceil(left))
+    if DB_CONNECT_TIMEOUT_SECONDS > 0:
+        timeout = min(timeout, DB_CONNECT_TIMEOUT_SECONDS)
+    return timeout
+
+
+class DeadlineConnectionPool(ThreadedConnectionPool):
+    # getconn() holds the pool lock around _connect, so updating the shared
+    # connect kwargs here is safe
+
+    def _connect(self, key=None):
+        self._kwargs["connect_timeout"] = _connect_timeout()
+        return super()._connect(key)
+
+
+class PooledConnection:
+    # Repositories call close() after every statement; for pooled
+    # connections that hands the connection back instead of dropping it.
+
+    def __init__(self, pool: DeadlineConnectionPool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+
+        if conn.closed:
+            self._pool.putconn(conn, close=True)
+            return
+
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        self._pool.putconn(conn)
+
+    def __del__(self):
+        # Last resort only: repositories close() in a finally block, since a
+        # failure kept in a traceback would otherwise hold its connection
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _get_pool() -> DeadlineConnectionPool:
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid != os.getpid():
+        # Inherited across fork: the sockets belong to the parent, so drop
+        # the reference without closing them.
+        _pool = None
+
+    if _pool is None:
+        _pool = DeadlineConnectionPool(
+            DB_POOL_MIN,
+            DB_POOL_MAX,
+            DATABASE_URL,
+            cursor_factory=InstrumentedCursor,
+        )
+        _pool_pid = os.getpid()
+
+    return _pool
+
+
 def get_db_conn():
-    return psycopg2.connect(
-        DATABASE_URL,
-        cursor_factory=RealDictCursor
-    )
+    start = time.perf_counter()
+
+    if DB_POOL_MAX <= 0:
+        conn = psycopg2.connect(
+            DATABASE_URL,
+            cursor_factory=InstrumentedCursor,
+            connect_timeout=_connect_timeout(),
+        )
+    else:
+        pool = _get_pool()
+        conn = PooledConnection(pool, pool.getconn())
+
+    record_connection((time.perf_counter() - start) * 1000)
+    return conn
+
+
+def close_db_pool():
+    global _pool
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.closeall()
+    _pool = None
+
+
+def check_db_ready():
+    conn = get_db_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def is_db_unavailable(error: Exception) -> bool:
+    # Refused or dropped connections carry no SQLSTATE; a server going away
+    # reports class 08 (connection exception) or 57P0x (e.g. AdminShutdown
+    # on failover). Statement errors such as QueryCanceled (57014) or
+    # serialization failures don't count.
+    if not isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        return False
+
+    code = getattr(error, "pgcode", None)
+    return code is None or code.startswith("08") or code.startswith("57P")
@@ -2,12 +2,23 @@ import os
 import redis
 
 REDIS_URL = os.getenv("REDIS_URL")
+# Keeps a hung Redis from holding a job past its deadline
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", 5))
 
-if not REDIS_URL:
-    raise RuntimeError("REDIS_URL is not set")
+def get_redis_client(decode_responses: bool = True):
+    # Queue payloads may be binary (see app.queues.codec), so the queue
+    # uses a client with decode_responses=False
+    if not REDIS_URL:
+        raise RuntimeError("REDIS_URL is not set")
 
-def get_redis_client():
     return redis.Redis.from_url(
         REDIS_URL,
-        decode_responses=True
+        decode_responses=decode_responses,
+        socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
     )
+
+def get_optional_redis_client(decode_responses: bool = True):
+    # None when the worker runs without Redis (QUEUE_BACKEND=postgres);
+    # the pack cache and Redis profiling controls are then disabled
+    return get_redis_client(decode_responses) if REDIS_URL else None
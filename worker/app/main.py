@@ -1,6 +1,14 @@
+import os
+
 from app.worker_app import WorkerApp
 
 def main():
+    processes = int(os.getenv("WORKER_PROCESSES", 0))
+    if processes > 0:
+        from app.prefork import PreforkSupervisor
+        PreforkSupervisor(processes).run()
+        return
+
     WorkerApp().consume()
 
 if __name__ == "__main__":
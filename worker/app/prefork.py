@@ -0,0 +1,185 @@
+import os
+import select
+import signal
+import socket
+import time
+
+from app.config.db import check_db_ready, close_db_pool
+from app.config.redis import get_optional_redis_client
+from app.worker_app import WorkerApp
+from app.utils.logger import logger
+
+
+class PreforkSupervisor:
+    # Warms imports, compiled patterns and dependency checks once in the
+    # parent, then forks children that inherit all of it.
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.ready_timeout = float(os.getenv("WORKER_READY_TIMEOUT_SECONDS", 30))
+        self.ready_file = os.getenv("WORKER_READY_FILE")
+        self.spawn_attempts = max(1, int(os.getenv("WORKER_SPAWN_ATTEMPTS", 3)))
+        self.worker_id = os.getenv("WORKER_ID", socket.gethostname())
+
+        self.pid = os.getpid()
+        self.children: dict[int, int] = {}
+        self.stopping = False
+
+    def run(self):
+        # A ready file left by a previous run must not report this one ready
+        self.remove_ready_file()
+        self.wait_for_dependencies()
+
+        # Installed before the first fork so a shutdown during startup
+        # reaches every child spawned so far
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        # Children open their own connections; sockets must not cross fork
+        close_db_pool()
+
+        for slot in range(self.processes):
+            if not self.spawn(slot):
+                if self.stopping:
+                    break
+                self.shutdown(f"Worker slot={slot} never reported ready")
+
+        if not self.stopping:
+            logger.info(f"✅ {len(self.children)} workers ready")
+            if self.ready_file:
+                with open(self.ready_file, "w") as f:
+                    f.write(str(os.getpid()))
+
+        self.supervise()
+
+    def wait_for_dependencies(self):
+        deadline = time.time() + self.ready_timeout
+        redis = get_optional_redis_client()
+
+        while True:
+            try:
+                if redis:
+                    redis.ping()
+                check_db_ready()
+                break
+            except Exception as e:
+                if time.time() >= deadline:
+                    raise RuntimeError(f"Dependencies not ready: {e}")
+                logger.warning(f"Waiting for Redis/Postgres: {e}")
+                time.sleep(1)
+
+        if redis:
+            redis.close()
+        logger.info("Dependencies ready")
+
+    def spawn(self, slot: int) -> bool:
+        # Returns False once every attempt failed to report ready, or as
+        # soon as a shutdown has started
+        for attempt in range(1, self.spawn_attempts + 1):
+            if self.stopping:
+                return False
+
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+
+            if pid == 0:
+                os.close(read_fd)
+                self.run_child(slot, write_fd)
+
+            os.close(write_fd)
+            self.children[pid] = slot
+
+            ready, _, _ = select.select([read_fd], [], [], self.ready_timeout)
+            reported = bool(ready) and os.read(read_fd, 1) == b"1"
+            os.close(read_fd)
+
+            if reported:
+                logger.info(f"Worker slot={slot} pid={pid} ready")
+                return True
+            if self.stopping:
+                # stop() already signalled it; supervise() reaps it
+                return False
+
+            logger.error(
+                f"Worker slot={slot} pid={pid} did not report ready "
+                f"(attempt {attempt}/{self.spawn_attempts})"
+            )
+            self.kill(pid)
+            time.sleep(1)
+
+        return False
+
+    def kill(self, pid: int, signum: int = signal.SIGKILL):
+        self.children.pop(pid, None)
+        try:
+            os.kill(pid, signum)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    def shutdown(self, reason: str):
+        # Stops the remaining children and fails the supervisor so the
+        # container is restarted instead of running short of workers
+        self.stopping = True
+        self.remove_ready_file()
+        for pid in list(self.children):
+            self.kill(pid, signal.SIGTERM)
+        raise RuntimeError(reason)
+
+    def remove_ready_file(self):
+        if self.ready_file:
+            try:
+                os.remove(self.ready_file)
+            except FileNotFoundError:
+                pass
+
+    def run_child(self, slot: int, ready_fd: int):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        code = 0
+        try:
+            # Slot-stable id so a replacement recovers its predecessor's in-flight jobs
+            app = WorkerApp(worker_id=f"{self.worker_id}:{slot}")
+            app.warm()
+            os.write(ready_fd, b"1")
+            os.close(ready_fd)
+            app.consume()
+        except Exception as e:
+            logger.critical(f"Worker slot={slot} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def supervise(self):
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            slot = self.children.pop(pid, None)
+            if slot is None or self.stopping:
+                continue
+
+            logger.warning(
+                f"Worker slot={slot} pid={pid} exited "
+                f"status={os.waitstatus_to_exitcode(status)}, replacing"
+            )
+            time.sleep(1)
+            if not self.spawn(slot) and not self.stopping:
+                self.shutdown(f"Worker slot={slot} could not be replaced")
+
+    def stop(self, signum, frame):
+        if os.getpid() != self.pid:
+            # A child signalled before run_child restored the default handler
+            os._exit(128 + signum)
+
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
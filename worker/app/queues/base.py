@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+
+
+class JobQueue(ABC):
+    # A popped job comes with a receipt (the raw payload for Redis, the
+    # outbox row id for Postgres) that identifies it for ack/requeue/DLQ.
+    # Each transition must be atomic on the backend.
+
+    @abstractmethod
+    def pop(self, timeout: float = 0) -> tuple[dict, object] | None:
+        # Waits up to `timeout` seconds for a job when the queue is empty
+        ...
+
+    @abstractmethod
+    def ack(self, receipt):
+        ...
+
+    @abstractmethod
+    def release(self, receipt, job: dict):
+        # Hands an untouched job back to the front of the queue (no attempt
+        # is counted) so an idle worker picks it up next
+        ...
+
+    @abstractmethod
+    def requeue(self, receipt, job: dict) -> int:
+        ...
+
+    @abstractmethod
+    def dead_letter(self, receipt, job: dict, error: str):
+        ...
+
+    @abstractmethod
+    def recover(self) -> int:
+        ...
@@ -0,0 +1,38 @@
+import json
+import os
+
+import msgpack
+
+# Framed payloads start with 0xC1, a byte msgpack never emits and that can
+# never start a JSON document, followed by the schema version. Anything
+# without the marker is a JSON payload; the API writes the same frame when
+# JOB_PAYLOAD_FORMAT=msgpack (api/src/utils/job.codec.ts).
+MAGIC = b"\xc1"
+SCHEMA_VERSION = 1
+
+PAYLOAD_FORMAT = os.getenv("JOB_PAYLOAD_FORMAT", "json")
+
+
+def encode(job: dict, payload_format: str = PAYLOAD_FORMAT) -> bytes:
+    if payload_format == "msgpack":
+        return MAGIC + bytes([SCHEMA_VERSION]) + msgpack.packb(job, use_bin_type=True)
+
+    # Plain JSON stays readable by workers that predate the codec
+    return json.dumps(job, separators=(",", ":")).encode("utf-8")
+
+
+def decode(payload: bytes | str) -> dict:
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+
+    if payload[:1] != MAGIC:
+        return json.loads(payload)
+
+    if len(payload) < 2:
+        raise ValueError("Truncated job payload frame")
+
+    version = payload[1]
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported job payload schema version {version}")
+
+    return msgpack.unpackb(payload[2:], raw=False)
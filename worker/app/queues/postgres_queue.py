@@ -0,0 +1,129 @@
+import os
+import select
+import time
+from collections import deque
+
+import psycopg2
+
+from app.config.db import DATABASE_URL
+from app.queues.base import JobQueue
+from app.repositories.job_outbox_repo import JobOutboxRepository
+from app.utils.logger import logger
+
+
+class PostgresJobQueue(JobQueue):
+    # Jobs live in core.job_outbox, written by the API in the same
+    # transaction as the document. Workers claim the pending jobs of one PA
+    # request at a time with FOR UPDATE SKIP LOCKED and sleep on
+    # LISTEN/NOTIFY between bursts.
+
+    def __init__(self, worker_id: str, claim_batch: int = 50):
+        self.worker_id = worker_id
+        self.claim_batch = claim_batch
+        # Fixed: core.notify_job_outbox() in scripts/db.migration.sql
+        # notifies this channel
+        self.channel = "job_outbox"
+        self.lease_seconds = int(os.getenv("OUTBOX_CLAIM_LEASE_SECONDS", 300))
+        self.reap_interval = int(os.getenv("OUTBOX_REAP_INTERVAL_SECONDS", 30))
+        self.last_reap = 0.0
+
+        self.repo = JobOutboxRepository()
+        self.buffer: deque[dict] = deque()
+        self.listen_conn = None
+        # Claim on the next pop; stays set while claims come back full
+        self.more_pending = True
+
+    def pop(self, timeout: float = 0) -> tuple[dict, int] | None:
+        popped = self._pop()
+        if popped is None and timeout > 0:
+            self.wait(timeout)
+            popped = self._pop()
+        return popped
+
+    def _pop(self) -> tuple[dict, int] | None:
+        self.reap()
+        if not self.buffer and (self.more_pending or self._drain_notifies()):
+            rows = self.repo.claim(self.worker_id, self.claim_batch)
+            # Claims cover one PA request, so a short claim says nothing
+            # about other PA requests still pending
+            self.more_pending = bool(rows)
+            self.buffer.extend(rows)
+
+        if not self.buffer:
+            return None
+
+        row = self.buffer.popleft()
+        job = dict(row["payload"])
+        job["attempt"] = row["attempt"]
+        return job, row["id"]
+
+    def ack(self, receipt: int):
+        self.repo.delete(receipt)
+
+    def release(self, receipt: int, job: dict):
+        # The rest of the buffer belongs to the same PA request; hand it
+        # back too so that group is not split across workers
+        ids = [receipt] + [row["id"] for row in self.buffer]
+        self.buffer.clear()
+        self.repo.release(ids)
+
+    def requeue(self, receipt: int, job: dict) -> int:
+        return self.repo.requeue(receipt, job)
+
+    def dead_letter(self, receipt: int, job: dict, error: str):
+        self.repo.mark_dead(receipt, job, error)
+
+    def recover(self) -> int:
+        count = self.repo.release_claims(self.worker_id, self.lease_seconds)
+        self.last_reap = time.monotonic()
+        if count:
+            logger.warning(f"Released {count} claimed outbox jobs")
+        return count
+
+    def reap(self) -> int:
+        # Hands back claims of workers that died after startup; without this
+        # their jobs would sit claimed until some worker restarts
+        now = time.monotonic()
+        if now - self.last_reap < self.reap_interval:
+            return 0
+        self.last_reap = now
+
+        try:
+            count = self.repo.release_expired_claims(self.worker_id, self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to release expired outbox claims: {e}")
+            return 0
+
+        if count:
+            logger.warning(f"Released {count} outbox jobs with expired claims")
+            self.more_pending = True
+        return count
+
+    def wait(self, timeout: float):
+        conn = self._listen()
+        if not self._drain_notifies():
+            select.select([conn], [], [], timeout)
+            self._drain_notifies()
+
+        # Woken or timed out: either way look again (this also picks up
+        # retried jobs, which are not re-notified, and missed notifications)
+        self.more_pending = True
+
+    def _listen(self):
+        if self.listen_conn is None or self.listen_conn.closed:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {self.channel}")
+            cur.close()
+            self.listen_conn = conn
+        return self.listen_conn
+
+    def _drain_notifies(self) -> bool:
+        if self.listen_conn is None:
+            return False
+
+        self.listen_conn.poll()
+        notified = bool(self.listen_conn.notifies)
+        self.listen_conn.notifies.clear()
+        return notified
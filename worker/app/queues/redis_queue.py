@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+from app.queues import codec
+from app.queues.base import JobQueue
+from app.utils.logger import logger
+
+
+# Drops a finished job from the in-flight list.
+# KEYS: processing | ARGV: payload
+ACK_SCRIPT = """
+return redis.call('LREM', KEYS[1], 1, ARGV[1])
+"""
+
+# Puts an in-flight payload back at the consuming end of the queue.
+# KEYS: processing, queue | ARGV: payload
+RELEASE_SCRIPT = """
+redis.call('LREM', KEYS[1], 1, ARGV[1])
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Atomically swaps an in-flight payload for its successor on another list
+# (the queue for a retry, the DLQ for a dead letter).
+# KEYS: processing, destination | ARGV: payload, next payload
+MOVE_SCRIPT = """
+redis.call('LREM', KEYS[1], 1, ARGV[1])
+redis.call('LPUSH', KEYS[2], ARGV[2])
+return 1
+"""
+
+# Returns everything left in-flight by a crashed worker to the queue.
+# KEYS: processing, queue
+RECOVER_SCRIPT = """
+local count = 0
+while redis.call('RPOPLPUSH', KEYS[1], KEYS[2]) do
+  count = count + 1
+end
+return count
+"""
+
+# Same as RECOVER_SCRIPT, but only while the owner's heartbeat is missing.
+# KEYS: processing, queue, heartbeat
+REAP_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+  return 0
+end
+local count = 0
+while redis.call('RPOPLPUSH', KEYS[1], KEYS[2]) do
+  count = count + 1
+end
+return count
+"""
+
+
+class RedisJobQueue(JobQueue):
+    # Each worker keeps its in-flight jobs on its own list and refreshes a
+    # heartbeat key from a background thread. Any worker returns the lists
+    # of owners whose heartbeat expired (crashed, or replaced under a new
+    # hostname) to the queue.
+
+    def __init__(self, redis, queue: str, dlq: str, worker_id: str):
+        self.redis = redis
+        self.queue = queue
+        self.dlq = dlq
+        self.worker_id = worker_id
+        self.processing_prefix = f"{queue}:processing:"
+        self.processing = f"{self.processing_prefix}{worker_id}"
+        self.heartbeat_prefix = f"{queue}:heartbeat:"
+        self.heartbeat = f"{self.heartbeat_prefix}{worker_id}"
+
+        self.heartbeat_interval = float(os.getenv("QUEUE_HEARTBEAT_SECONDS", 10))
+        self.heartbeat_ttl = int(self.heartbeat_interval * 3)
+        self.reap_interval = float(os.getenv("QUEUE_REAP_INTERVAL_SECONDS", 30))
+        self.heartbeat_thread = None
+
+        self._ack = redis.register_script(ACK_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+        self._move = redis.register_script(MOVE_SCRIPT)
+        self._recover = redis.register_script(RECOVER_SCRIPT)
+        self._reap = redis.register_script(REAP_SCRIPT)
+
+    def pop(self, timeout: float = 0) -> tuple[dict, bytes] | None:
+        # LMOVE/BLMOVE atomically take the oldest job onto the in-flight
+        # list; the blocking form wakes as soon as a job is pushed.
+        # REDIS_SOCKET_TIMEOUT_SECONDS must exceed the poll timeout.
+        while True:
+            if timeout > 0:
+                payload = self.redis.blmove(self.queue, self.processing, timeout, "RIGHT", "LEFT")
+            else:
+                payload = self.redis.lmove(self.queue, self.processing, "RIGHT", "LEFT")
+            if payload is None:
+                return None
+
+            try:
+                return codec.decode(payload), payload
+            except Exception as e:
+                # Left in-flight it would be recovered onto the queue forever
+                logger.error(f"Dead-lettering undecodable payload: {e}")
+                self._move(keys=[self.processing, self.dlq], args=[payload, payload])
+
+    def ack(self, payload: bytes):
+        self._ack(keys=[self.processing], args=[payload])
+
+    def release(self, payload: bytes, job: dict):
+        self._release(keys=[self.processing, self.queue], args=[payload])
+
+    def requeue(self, payload: bytes, job: dict) -> int:
+        attempt = job.get("attempt", 1) + 1
+        self._move(
+            keys=[self.processing, self.queue],
+            args=[payload, codec.encode({**job, "attempt": attempt})],
+        )
+        return attempt
+
+    def dead_letter(self, payload: bytes, job: dict, error: str):
+        self._move(
+            keys=[self.processing, self.dlq],
+            args=[
+                payload,
+                codec.encode({**job, "error": error, "failed_at": time.time()}),
+            ],
+        )
+
+    def recover(self) -> int:
+        self.beat()
+        count = self._recover(keys=[self.processing, self.queue])
+        if count:
+            logger.warning(
+                f"Recovered {count} in-flight jobs from {self.processing}"
+            )
+
+        if self.heartbeat_thread is None:
+            self.heartbeat_thread = threading.Thread(
+                target=self.run_heartbeat, name="queue-heartbeat", daemon=True
+            )
+            self.heartbeat_thread.start()
+        return count
+
+    def beat(self):
+        self.redis.set(self.heartbeat, 1, ex=self.heartbeat_ttl)
+
+    def reap(self) -> int:
+        total = 0
+        for key in self.redis.scan_iter(match=f"{self.processing_prefix}*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            owner = key[len(self.processing_prefix):]
+            if owner == self.worker_id:
+                continue
+
+            count = self._reap(
+                keys=[key, self.queue, f"{self.heartbeat_prefix}{owner}"]
+            )
+            if count:
+                logger.warning(f"Reaped {count} in-flight jobs of dead worker {owner}")
+            total += count
+        return total
+
+    def run_heartbeat(self):
+        last_reap = 0.0
+        while True:
+            try:
+                self.beat()
+                if time.monotonic() - last_reap >= self.reap_interval:
+                    last_reap = time.monotonic()
+                    self.reap()
+            except Exception as e:
+                logger.warning(f"Queue heartbeat failed: {e}")
+            time.sleep(self.heartbeat_interval)
@@ -0,0 +1,74 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import time
+
+from app.services.evidence_extractor import CRITERIA_PATTERNS
+from app.utils.logger import logger
+
+# Prefork children inherit the parent's salt, so a PA request gets the same
+# alias in every process of one host; set TRAFFIC_RECORD_SALT to share it
+# across hosts
+RECORD_SALT = os.getenv("TRAFFIC_RECORD_SALT") or secrets.token_hex(16)
+
+
+class TrafficRecorder:
+    # Appends one JSON line per extracted document: enqueue time (epoch),
+    # a salted hash standing in for the PA request, document size and
+    # per-criterion match counts. No text or identifiers are written.
+    # Each process writes its own file next to TRAFFIC_RECORD_PATH
+    # (traffic.jsonl -> traffic.<host>-<pid>.jsonl); load_trace merges them.
+
+    def __init__(self, path: str):
+        root, ext = os.path.splitext(path)
+        self.path = f"{root}.{socket.gethostname()}-{os.getpid()}{ext}"
+        self.arrivals: dict[int, float] = {}
+
+    @classmethod
+    def from_env(cls) -> "TrafficRecorder | None":
+        path = os.getenv("TRAFFIC_RECORD_PATH")
+        if not path:
+            return None
+
+        recorder = cls(path)
+        logger.info(f"Recording traffic shape to {recorder.path}")
+        return recorder
+
+    def arrived(self, job: dict):
+        # Enqueue time keeps the burstiness of the traffic; pop time would
+        # only show how fast this worker drains a backlog. Payloads from
+        # before enqueued_at existed fall back to pop time.
+        self.arrivals[id(job)] = job.get("enqueued_at") or time.time()
+
+    def clear(self):
+        # Drops arrivals of jobs that failed before extraction
+        self.arrivals.clear()
+
+    def alias(self, pa_request_id) -> str:
+        return hmac.new(
+            RECORD_SALT.encode(), str(pa_request_id).encode(), hashlib.sha256
+        ).hexdigest()[:16]
+
+    def record(self, job: dict, text: str, evidence: dict):
+        arrived_at = self.arrivals.pop(id(job), None) or job.get("enqueued_at") or time.time()
+
+        entry = {
+            "ts": round(arrived_at, 4),
+            "pa": self.alias(job.get("pa_request_id")),
+            "attempt": job.get("attempt", 1),
+            "chars": len(text),
+            "lines": text.count("\n") + 1,
+            "matches": {
+                criterion: len((evidence.get(criterion) or {}).get("source") or [])
+                for criterion in CRITERIA_PATTERNS
+            },
+        }
+
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to record traffic shape: {e}")
@@ -0,0 +1,123 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+import uuid
+
+from app.config.redis import get_redis_client
+from app.queues import codec
+from app.replay.synthetic import generate_note
+from app.repositories.replay_repo import ReplayRepository
+from app.utils.logger import logger
+
+# Replays a trace written by TrafficRecorder against a local stack:
+#   python -m app.replay.replayer traffic.jsonl --speed 4
+
+
+def load_trace(path: str, limit: int | None = None) -> list[dict]:
+    # Accepts one file, or the TRAFFIC_RECORD_PATH the workers were given,
+    # in which case every per-process file next to it is merged
+    root, ext = os.path.splitext(path)
+    paths = [path] if os.path.isfile(path) else sorted(glob.glob(f"{root}.*{ext}"))
+    if not paths:
+        raise FileNotFoundError(f"No trace files for {path}")
+
+    entries = []
+    for trace_path in paths:
+        with open(trace_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                # Retries are produced by the worker under test, not replayed
+                if entry.get("attempt", 1) > 1:
+                    continue
+                entries.append(entry)
+
+    # Absolute enqueue times share one clock across processes; offsets are
+    # taken from the earliest entry of the merged trace
+    entries.sort(key=lambda entry: entry["ts"])
+    if limit:
+        entries = entries[:limit]
+    if entries:
+        started_at = entries[0]["ts"]
+        for entry in entries:
+            entry["t"] = entry["ts"] - started_at
+    return entries
+
+
+class Replayer:
+
+    def __init__(self, speed: float = 1.0, seed: int = 0):
+        self.speed = speed
+        self.rng = random.Random(seed)
+        self.repo = ReplayRepository()
+        # Jobs go where the workers under test read them from
+        self.backend = os.getenv("QUEUE_BACKEND", "redis")
+        self.redis = None if self.backend == "postgres" else get_redis_client(decode_responses=False)
+        self.queue = os.getenv("QUEUE_NAME", "document_processing_queue")
+
+    def seed(self, entries: list[dict]) -> list[dict]:
+        # Writes every PA request and document up front so the timed phase
+        # only pushes jobs, like the API does after its own writes
+        pa_requests: dict[int, int] = {}
+        jobs = []
+
+        for entry in entries:
+            if entry["pa"] not in pa_requests:
+                pa_requests[entry["pa"]] = self.repo.create_pa_request()
+            pa_request_id = pa_requests[entry["pa"]]
+
+            document = self.repo.create_document(
+                pa_request_id, generate_note(entry, self.rng)
+            )
+            jobs.append({
+                "job_uuid": str(uuid.uuid4()),
+                "document_id": document["id"],
+                "document_uuid": str(document["document_uuid"]),
+                "pa_request_id": pa_request_id,
+            })
+
+        logger.info(
+            f"Seeded {len(jobs)} documents across {len(pa_requests)} PA requests"
+        )
+        return jobs
+
+    def replay(self, entries: list[dict], jobs: list[dict]):
+        started_at = time.time()
+
+        for entry, job in zip(entries, jobs):
+            delay = started_at + entry["t"] / self.speed - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.push({**job, "enqueued_at": time.time()})
+
+        elapsed = time.time() - started_at
+        logger.info(
+            f"Replayed {len(jobs)} jobs in {elapsed:.1f}s at {self.speed}x"
+        )
+
+    def push(self, job: dict):
+        if self.backend == "postgres":
+            self.repo.enqueue_outbox_job(job)
+        else:
+            self.redis.lpush(self.queue, codec.encode(job))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded worker traffic")
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    entries = load_trace(args.trace, args.limit)
+    replayer = Replayer(speed=args.speed, seed=args.seed)
+    replayer.replay(entries, replayer.seed(entries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import random
+
+from app.services.evidence_extractor import COMPILED_PATTERNS
+
+# One phrase per criterion that its pattern matches
+MATCH_PHRASES = {
+    "diagnosis": "findings consistent with osteoarthritis of the knee",
+    "conservative_therapy": "completed six weeks of physical therapy",
+    "imaging_present": "weight bearing x-ray reviewed today",
+    "functional_limitation": "reports difficulty walking more than one block",
+}
+
+# Filler that none of the criterion patterns can match
+FILLER_WORDS = [
+    "patient", "seen", "for", "follow", "up", "visit", "today", "reports",
+    "stable", "vitals", "within", "normal", "limits", "plan", "discussed",
+    "history", "reviewed", "no", "acute", "distress", "noted", "the", "and",
+    "with", "left", "right", "knee", "clinic", "note", "continue", "current",
+]
+
+for word in FILLER_WORDS:
+    assert not any(p.search(word) for p in COMPILED_PATTERNS.values()), word
+
+
+def _filler_line(rng: random.Random, length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(FILLER_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def generate_note(shape: dict, rng: random.Random) -> str:
+    # Same line count, roughly the same size and exactly the same number of
+    # matching lines per criterion as the recorded document
+    line_count = max(1, shape["lines"])
+    line_length = max(1, shape["chars"] // line_count)
+
+    lines = [_filler_line(rng, line_length) for _ in range(line_count)]
+
+    free = list(range(line_count))
+    rng.shuffle(free)
+    for criterion, count in shape["matches"].items():
+        for _ in range(min(count, len(free))):
+            lines[free.pop()] = MATCH_PHRASES[criterion]
+
+    return "\n".join(lines)
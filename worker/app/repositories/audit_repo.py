@@ -13,30 +13,32 @@ class AuditRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO core.audit_logs
-              (
-                pa_request_id,
-                actor,
-                action,
-                metadata,
-                created_by,
-                modified_by
-              )
-            VALUES
-              (%s, %s, %s, %s, %s, %s)
-            """,
-            (
-                pa_request_id,
-                actor,
-                action,
-                Json(metadata) if metadata else None,
-                actor,
-                actor,
-            ),
-        )
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.audit_logs
+                  (
+                    pa_request_id,
+                    actor,
+                    action,
+                    metadata,
+                    created_by,
+                    modified_by
+                  )
+                VALUES
+                  (%s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    pa_request_id,
+                    actor,
+                    action,
+                    Json(metadata) if metadata else None,
+                    actor,
+                    actor,
+                ),
+            )
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
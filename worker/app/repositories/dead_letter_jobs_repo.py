@@ -14,30 +14,37 @@ class DeadLetterJobsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO core.dead_letter_jobs
-              (
-                job_uuid,
-                document_id,
-                reason,
-                payload,
-                created_by,
-                modified_by
-              )
-            VALUES
-              (%s, %s, %s, %s, %s, %s)
-            """,
-            (
-                job_uuid,
-                document_id,
-                reason,
-                Json(payload),
-                actor,
-                actor,
-            ),
-        )
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.dead_letter_jobs
+                  (
+                    job_uuid,
+                    document_id,
+                    reason,
+                    payload,
+                    created_by,
+                    modified_by
+                  )
+                SELECT %s::uuid, %s::integer, %s, %s::jsonb, %s, %s
+                WHERE NOT EXISTS (
+                  SELECT 1
+                  FROM core.dead_letter_jobs
+                  WHERE job_uuid = %s
+                )
+                """,
+                (
+                    job_uuid,
+                    document_id,
+                    reason,
+                    Json(payload),
+                    actor,
+                    actor,
+                    job_uuid,
+                ),
+            )
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
@@ -6,18 +6,20 @@ class DocumentsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            SELECT text
-            FROM phi.document_text
-            WHERE document_id = %s
-            """,
-            (document_id,)
-        )
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                SELECT text
+                FROM phi.document_text
+                WHERE document_id = %s
+                """,
+                (document_id,)
+            )
+
+            row = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
 
         return row["text"] if row else None
 
@@ -25,17 +27,19 @@ class DocumentsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            UPDATE core.documents
-            SET status = %s,
-                modified_at = NOW(),
-                modified_by = 'worker'
-            WHERE id = %s
-            """,
-            (status, document_id)
-        )
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                UPDATE core.documents
+                SET status = %s,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                """,
+                (status, document_id)
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
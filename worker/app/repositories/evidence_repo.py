@@ -1,6 +1,6 @@
 from app.config.db import get_db_conn
 from app.utils.constants import EvidencePackStatus
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 from app.utils.logger import logger
 
 class EvidenceRepository:
@@ -9,21 +9,23 @@ class EvidenceRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO core.evidence_packs
-              (pa_request_id, status, created_by, modified_by)
-            VALUES
-              (%s, %s, 'worker', 'worker')
-            RETURNING id
-            """,
-            (pa_request_id, EvidencePackStatus.CREATED)
-        )
-
-        pack_id = cur.fetchone()["id"]
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.evidence_packs
+                  (pa_request_id, status, created_by, modified_by)
+                VALUES
+                  (%s, %s, 'worker', 'worker')
+                RETURNING id
+                """,
+                (pa_request_id, EvidencePackStatus.CREATED)
+            )
+
+            pack_id = cur.fetchone()["id"]
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
 
         return pack_id
 
@@ -41,39 +43,106 @@ class EvidenceRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO phi.extracted_evidence
-            (
-                evidence_pack_id,
-                diagnosis,
-                imaging_present,
-                therapy_attempted,
-                functional_limitation,
-                missing_fields,
-                sources,
-                document_id,
-                created_by,
-                modified_by
+        try:
+            cur.execute(
+                """
+                INSERT INTO phi.extracted_evidence
+                (
+                    evidence_pack_id,
+                    diagnosis,
+                    imaging_present,
+                    therapy_attempted,
+                    functional_limitation,
+                    missing_fields,
+                    sources,
+                    document_id,
+                    created_by,
+                    modified_by
+                )
+                VALUES
+                (%s, %s, %s, %s, %s, %s, %s, %s,'worker', 'worker')
+                """,
+                (
+                    evidence_pack_id,
+                    diagnosis,
+                    imaging_present,
+                    therapy_attempted,
+                    functional_limitation,
+                    Json(missing_fields),
+                    Json(sources),
+                    document_id
+                ),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def replace_extracted_evidence_many(
+        self,
+        evidence_pack_id: int,
+        rows: list[dict],
+    ):
+        # Replaces each document's rows in one transaction, so retried jobs
+        # and replayed spool entries never leave duplicates behind
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                DELETE FROM phi.extracted_evidence
+                WHERE evidence_pack_id = %s
+                  AND document_id = ANY(%s)
+                """,
+                (evidence_pack_id, [row["document_id"] for row in rows]),
+            )
+
+            execute_values(
+                cur,
+                """
+                INSERT INTO phi.extracted_evidence
+                (
+                    evidence_pack_id,
+                    diagnosis,
+                    imaging_present,
+                    therapy_attempted,
+                    functional_limitation,
+                    missing_fields,
+                    sources,
+                    document_id,
+                    created_by,
+                    modified_by
+                )
+                VALUES %s
+                """,
+                [
+                    (
+                        evidence_pack_id,
+                        row["diagnosis"],
+                        row["imaging_present"],
+                        row["therapy_attempted"],
+                        row["functional_limitation"],
+                        Json(row["missing_fields"]),
+                        Json(row["sources"]),
+                        row["document_id"],
+                        "worker",
+                        "worker",
+                    )
+                    for row in rows
+                ],
             )
-            VALUES
-            (%s, %s, %s, %s, %s, %s, %s, %s,'worker', 'worker')
-            """,
-            (
-                evidence_pack_id,
-                diagnosis,
-                imaging_present,
-                therapy_attempted,
-                functional_limitation,
-                Json(missing_fields),
-                Json(sources),
-                document_id
-            ),
-        )
-
-        conn.commit()
-        cur.close()
-        conn.close()
+
+            conn.commit()
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to replace extracted evidence: {e}")
+            raise
+        finally:
+            cur.close()
+            conn.close()
 
     def update_evidence_pack_decision(
         self,
@@ -128,6 +197,145 @@ class EvidenceRepository:
             cur.close()
             conn.close()
 
+    def finalize_evidence_pack(
+        self,
+        evidence_pack_id: int,
+        pa_request_id: int,
+        decision: str,
+        explanation: str,
+        sources: dict,
+        metadata: dict,
+        state_version: int,
+        pa_status: str,
+        pa_status_unless: tuple[str, ...],
+        audit_logs: list[tuple[str, dict | None]],
+    ) -> bool:
+        # Writes the decision, the PA request status and the audit rows in
+        # one transaction, only while state_version is current. The guarded
+        # UPDATE locks the evidence pack row, so a newer merge_criteria_state
+        # waits for this commit and the newer decision's status always lands
+        # after this one. Returns False when superseded.
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.evidence_packs
+                SET
+                    status = 'finalized',
+                    decision = %s,
+                    explanation = %s,
+                    sources = %s,
+                    metadata = %s,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                  AND state_version = %s
+                """,
+                (
+                    decision,
+                    explanation,
+                    Json(sources),
+                    Json(metadata),
+                    evidence_pack_id,
+                    state_version,
+                ),
+            )
+
+            if cur.rowcount == 0:
+                conn.rollback()
+                return False
+
+            cur.execute(
+                """
+                UPDATE core.pa_requests
+                SET status = %s,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                  AND status NOT IN %s
+                """,
+                (pa_status, pa_request_id, pa_status_unless),
+            )
+
+            for action, audit_metadata in audit_logs:
+                cur.execute(
+                    """
+                    INSERT INTO core.audit_logs
+                      (
+                        pa_request_id,
+                        actor,
+                        action,
+                        metadata,
+                        created_by,
+                        modified_by
+                      )
+                    VALUES
+                      (%s, 'WORKER', %s, %s, 'WORKER', 'WORKER')
+                    """,
+                    (
+                        pa_request_id,
+                        action,
+                        Json(audit_metadata) if audit_metadata else None,
+                    ),
+                )
+
+            conn.commit()
+            return True
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(
+                f"Failed to finalize evidence pack {evidence_pack_id}: {e}"
+            )
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def merge_criteria_state(
+        self,
+        evidence_pack_id: int,
+        contributions: dict,
+    ) -> tuple[dict, int]:
+        # Adds or replaces per-document criterion evidence in one atomic
+        # update and returns the full per-PA state with its new version
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.evidence_packs
+                SET
+                    criteria_state = criteria_state || %s,
+                    state_version = state_version + 1,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                RETURNING criteria_state, state_version
+                """,
+                (Json(contributions), evidence_pack_id),
+            )
+
+            row = cur.fetchone()
+            if not row:
+                raise Exception(
+                    f"Evidence pack {evidence_pack_id} not found"
+                )
+
+            conn.commit()
+            return row["criteria_state"], row["state_version"]
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to merge criteria state: {e}")
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
     def create_or_get_evidence_pack(self, pa_request_id: int) -> int:
         conn = get_db_conn()
         cur = conn.cursor()
@@ -0,0 +1,212 @@
+from app.config.db import get_db_conn
+from psycopg2.extras import Json
+
+
+class JobOutboxRepository:
+
+    def claim(self, worker_id: str, limit: int) -> list[dict]:
+        # Oldest pending job and the other pending jobs of its PA request
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                WITH head AS (
+                  SELECT payload->'pa_request_id' AS pa_request_id
+                  FROM core.job_outbox
+                  WHERE status = 'pending'
+                    AND available_at <= NOW()
+                  ORDER BY id
+                  LIMIT 1
+                  FOR UPDATE SKIP LOCKED
+                ),
+                next_jobs AS (
+                  SELECT pending.id
+                  FROM core.job_outbox pending, head
+                  WHERE pending.status = 'pending'
+                    AND pending.available_at <= NOW()
+                    AND pending.payload->'pa_request_id' = head.pa_request_id
+                  ORDER BY pending.id
+                  LIMIT %s
+                  FOR UPDATE OF pending SKIP LOCKED
+                )
+                UPDATE core.job_outbox o
+                SET status = 'claimed',
+                    claimed_by = %s,
+                    claimed_at = NOW(),
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                FROM next_jobs
+                WHERE o.id = next_jobs.id
+                RETURNING o.id, o.payload, o.attempt
+                """,
+                (limit, worker_id),
+            )
+
+            rows = cur.fetchall()
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        return sorted(rows, key=lambda row: row["id"])
+
+    def delete(self, outbox_id: int):
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                DELETE FROM core.job_outbox
+                WHERE id = %s
+                """,
+                (outbox_id,),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def release(self, outbox_ids: list[int]):
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.job_outbox
+                SET status = 'pending',
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = ANY(%s)
+                  AND status = 'claimed'
+                """,
+                (outbox_ids,),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def requeue(self, outbox_id: int, job: dict) -> int:
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.job_outbox
+                SET status = 'pending',
+                    attempt = attempt + 1,
+                    payload = %s::jsonb || jsonb_build_object('attempt', attempt + 1),
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                RETURNING attempt
+                """,
+                (Json(job), outbox_id),
+            )
+
+            row = cur.fetchone()
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        return row["attempt"] if row else job.get("attempt", 1) + 1
+
+    def mark_dead(self, outbox_id: int, job: dict, error: str):
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.job_outbox
+                SET status = 'dead',
+                    last_error = %s,
+                    payload = %s::jsonb || jsonb_build_object(
+                      'error', %s::text,
+                      'failed_at', EXTRACT(EPOCH FROM NOW())
+                    ),
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE id = %s
+                """,
+                (error, Json(job), error, outbox_id),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def release_expired_claims(self, worker_id: str, lease_seconds: int) -> int:
+        # Other workers' claims whose lease ran out (the worker died or hung)
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.job_outbox
+                SET status = 'pending',
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE status = 'claimed'
+                  AND claimed_by <> %s
+                  AND claimed_at < NOW() - make_interval(secs => %s)
+                """,
+                (worker_id, lease_seconds),
+            )
+
+            count = cur.rowcount
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        return count
+
+    def release_claims(self, worker_id: str, lease_seconds: int) -> int:
+        # Returns this worker's leftovers, and any claim whose lease expired
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                UPDATE core.job_outbox
+                SET status = 'pending',
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    modified_at = NOW(),
+                    modified_by = 'worker'
+                WHERE status = 'claimed'
+                  AND (
+                    claimed_by = %s
+                    OR claimed_at < NOW() - make_interval(secs => %s)
+                  )
+                """,
+                (worker_id, lease_seconds),
+            )
+
+            count = cur.rowcount
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        return count
@@ -6,32 +6,34 @@ class ProcessingJobsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO core.processing_jobs
-            (job_uuid, document_id, status, attempt_count, trace_id,
-            created_by, modified_by)
-            VALUES
-            (%s, %s, 'PROCESSING', 1, %s, 'worker', 'worker')
-            ON CONFLICT (job_uuid)
-            DO UPDATE SET
-            attempt_count = core.processing_jobs.attempt_count + 1,
-            status = 'PROCESSING',
-            trace_id = EXCLUDED.trace_id,
-            modified_at = NOW(),
-            modified_by = 'worker'
-            RETURNING attempt_count
-            """,
-            (job_uuid, document_id, trace_id),
-        )
-
-        row = cur.fetchone()
-        if not row:
-            raise Exception("Processing job upsert failed")
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.processing_jobs
+                (job_uuid, document_id, status, attempt_count, trace_id,
+                created_by, modified_by)
+                VALUES
+                (%s, %s, 'PROCESSING', 1, %s, 'worker', 'worker')
+                ON CONFLICT (job_uuid)
+                DO UPDATE SET
+                attempt_count = core.processing_jobs.attempt_count + 1,
+                status = 'PROCESSING',
+                trace_id = EXCLUDED.trace_id,
+                modified_at = NOW(),
+                modified_by = 'worker'
+                RETURNING attempt_count
+                """,
+                (job_uuid, document_id, trace_id),
+            )
+
+            row = cur.fetchone()
+            if not row:
+                raise Exception("Processing job upsert failed")
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
 
         return row[0]
 
@@ -39,42 +41,46 @@ class ProcessingJobsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            UPDATE core.processing_jobs
-            SET
-              status = 'SUCCESS',
-              modified_at = NOW(),
-              modified_by = 'worker'
-            WHERE job_uuid = %s
-            """,
-            (job_uuid,),
-        )
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                UPDATE core.processing_jobs
+                SET
+                  status = 'SUCCESS',
+                  modified_at = NOW(),
+                  modified_by = 'worker'
+                WHERE job_uuid = %s
+                """,
+                (job_uuid,),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
 
     def mark_failed(self, job_uuid: str, error: str):
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            UPDATE core.processing_jobs
-            SET
-              status = 'FAILED',
-              last_error = %s,
-              modified_at = NOW(),
-              modified_by = 'worker'
-            WHERE job_uuid = %s
-            """,
-            (error, job_uuid),
-        )
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                UPDATE core.processing_jobs
+                SET
+                  status = 'FAILED',
+                  last_error = %s,
+                  modified_at = NOW(),
+                  modified_by = 'worker'
+                WHERE job_uuid = %s
+                """,
+                (error, job_uuid),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
 
 
     def upsert_processing(
@@ -88,30 +94,59 @@ class ProcessingJobsRepository:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute(
-            """
-            INSERT INTO core.processing_jobs
-            (job_uuid, document_id, status, attempt_count, last_error,
-            created_by, modified_by)
-            VALUES
-            (%s, %s, %s, %s, %s, 'worker', 'worker')
-            ON CONFLICT (job_uuid)
-            DO UPDATE SET
-            status = EXCLUDED.status,
-            attempt_count = EXCLUDED.attempt_count,
-            last_error = EXCLUDED.last_error,
-            modified_at = NOW(),
-            modified_by = 'worker'
-            """,
-            (
-                job_uuid,
-                document_id,
-                status,
-                attempt_count,
-                last_error,
-            ),
-        )
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.processing_jobs
+                (job_uuid, document_id, status, attempt_count, last_error,
+                created_by, modified_by)
+                VALUES
+                (%s, %s, %s, %s, %s, 'worker', 'worker')
+                ON CONFLICT (job_uuid)
+                DO UPDATE SET
+                status = EXCLUDED.status,
+                attempt_count = EXCLUDED.attempt_count,
+                last_error = EXCLUDED.last_error,
+                modified_at = NOW(),
+                modified_by = 'worker'
+                """,
+                (
+                    job_uuid,
+                    document_id,
+                    status,
+                    attempt_count,
+                    last_error,
+                ),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def superseded_documents(self, job_uuids: list[str]) -> set[int]:
+        # Documents that another job finished after these jobs started
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                SELECT DISTINCT spooled.document_id
+                FROM core.processing_jobs spooled
+                JOIN core.processing_jobs newer
+                  ON newer.document_id = spooled.document_id
+                 AND newer.job_uuid <> spooled.job_uuid
+                 AND newer.modified_at > spooled.modified_at
+                 AND UPPER(newer.status) = 'SUCCESS'
+                WHERE spooled.job_uuid = ANY(%s::uuid[])
+                """,
+                (job_uuids,),
+            )
+
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+
+        return {row["document_id"] for row in rows}
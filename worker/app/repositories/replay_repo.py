@@ -0,0 +1,95 @@
+import uuid
+
+from app.config.db import get_db_conn
+from psycopg2.extras import Json
+
+
+class ReplayRepository:
+    # Seeds the rows the API would have written for a replayed upload
+
+    def create_pa_request(self, actor: str = "replay") -> int:
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.pa_requests
+                  (status, created_by, modified_by)
+                VALUES
+                  ('processing', %s, %s)
+                RETURNING id
+                """,
+                (actor, actor),
+            )
+
+            pa_request_id = cur.fetchone()["id"]
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        return pa_request_id
+
+    def create_document(
+        self,
+        pa_request_id: int,
+        text: str,
+        actor: str = "replay",
+    ) -> dict:
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.documents
+                  (pa_request_id, idempotency_key, status, created_by, modified_by)
+                VALUES
+                  (%s, %s, 'uploaded', %s, %s)
+                RETURNING id, document_uuid
+                """,
+                (pa_request_id, str(uuid.uuid4()), actor, actor),
+            )
+            document = cur.fetchone()
+
+            cur.execute(
+                """
+                INSERT INTO phi.document_text
+                  (document_id, text, created_by, modified_by)
+                VALUES
+                  (%s, %s, %s, %s)
+                """,
+                (document["id"], text, actor, actor),
+            )
+
+            conn.commit()
+            return document
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def enqueue_outbox_job(self, job: dict, actor: str = "replay"):
+        # What the API writes alongside the document when QUEUE_BACKEND=postgres
+        conn = get_db_conn()
+        cur = conn.cursor()
+
+        try:
+            cur.execute(
+                """
+                INSERT INTO core.job_outbox
+                  (job_uuid, payload, created_by, modified_by)
+                VALUES
+                  (%s, %s, %s, %s)
+                """,
+                (job["job_uuid"], Json(job), actor, actor),
+            )
+
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
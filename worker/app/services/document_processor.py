@@ -1,164 +1,341 @@
 import time
 import uuid
+from app.config.db import is_db_unavailable
+from app.config.redis import get_optional_redis_client
 from app.repositories.documents_repo import DocumentsRepository
 from app.repositories.evidence_repo import EvidenceRepository
 from app.utils.logger import logger
-from app.utils.constants import AuditAction, DocumentStatus
+from app.utils.constants import AuditAction, DocumentStatus, EvidencePackStatus, PaRequestStatus
 from app.repositories.pa_requests_repo import PaRequestsRepository
 from app.repositories.audit_repo import AuditRepository
+from app.services.evidence_aggregator import EvidenceAggregator
+from app.services.evidence_pack_cache import EvidencePackCache
 from app.services.evidence_extractor import EvidenceExtractor
 from app.services.policy_evaluator import PolicyEvaluator
 from app.repositories.processing_jobs_repo import ProcessingJobsRepository
+from app.utils import deadline
 
 
 class DocumentProcessor:
 
-    def __init__(self):
+    def __init__(self, recorder=None, spool=None):
+        self.recorder = recorder
+        self.spool = spool
         self.documents_repo = DocumentsRepository()
         self.evidence_repo = EvidenceRepository()
         self.pa_requests_repo = PaRequestsRepository()
         self.audit_repo = AuditRepository()
         self.extractor = EvidenceExtractor()
         self.policy = PolicyEvaluator()
+        self.aggregator = EvidenceAggregator()
         self.processing_jobs_repo = ProcessingJobsRepository()
+        self.pack_cache = EvidencePackCache(get_optional_redis_client())
 
     def process(self, job: dict):
-        logger.info("Starting document processing")
-        document_id = job["document_id"]
-        pa_request_id = job["pa_request_id"]
-        job_uuid = job["job_uuid"]
+        failures = self.process_group([job])
+        if failures:
+            raise failures[job["job_uuid"]]
+
+    def process_group(
+        self, jobs: list[dict], started_at: float | None = None
+    ) -> dict[str, Exception]:
+        # Every job in the group belongs to the same PA request: each document
+        # is extracted on its own, then the evidence pack, decision and PA
+        # status are written once for the whole group.
+        # Returns the exception for each job_uuid that failed.
+        # Each document's fetch and extraction gets its own
+        # JOB_DEADLINE_SECONDS budget, so one slow note fails alone; the
+        # first one counts from started_at (time.monotonic when the group was
+        # popped) so coalescing is charged to it. The finalize has a budget
+        # of its own, and failure bookkeeping runs outside any.
+        pa_request_id = jobs[0]["pa_request_id"]
+        logger.info(
+            f"Starting document processing for PA request {pa_request_id} "
+            f"({len(jobs)} documents)"
+        )
 
-        logger.info(f"Processing job_uuid: {job_uuid} for document_id: {document_id}")
         trace_id = str(uuid.uuid4())
         start_time = time.time()
 
-        logger.info(f"Upserting processing job for document {document_id} {trace_id} {start_time}")
+        failures = {}
+        prepared = []
 
-        attempt_count = 1
-        # attempt_count = self.processing_jobs_repo.upsert_processing_job(
-        #     job_uuid=job_uuid,
-        #     document_id=document_id,
-        #     trace_id=trace_id,
-        # )
+        for index, job in enumerate(jobs):
+            try:
+                with deadline.job_deadline(
+                    label=f"document {job['document_id']}",
+                    started_at=started_at if index == 0 else None,
+                ):
+                    prepared.append(self._prepare(job))
+            except Exception as e:
+                self._fail(job, e)
+                failures[job["job_uuid"]] = e
 
-        logger.info(f"Processing document: {document_id}")
+        if not prepared:
+            return failures
 
         try:
-            logger.info(f"Fetching text for document {document_id}")
-            text = self.documents_repo.fetch_document_text(document_id)
-            logger.info(f"Fetched text for document {document_id}")
-            if not text:
-                raise Exception("Document text not found")
-
-            # STEP B: Deterministic extraction
-            logger.info(f"Extracting evidence from document {document_id}")
-            evidence = self.extractor.extract(text)
-
-            # STEP C: Policy evaluation
-            logger.info(f"Evaluating policy for PA request {pa_request_id}")            
-            policy_result = self.policy.evaluate_tka(evidence)
-
-            # STEP D: Evidence pack (idempotent)
-            logger.info(f"Creating/updating evidence pack for PA request {pa_request_id}")
-            evidence_pack_id = self.evidence_repo.create_or_get_evidence_pack(
-                pa_request_id
-            )
+            with deadline.job_deadline(label=f"PA request {pa_request_id}"):
+                self._finalize(pa_request_id, prepared, trace_id, start_time)
+        except Exception as e:
+            if self.spool is not None and is_db_unavailable(e):
+                # Extraction is done; keep the results and let the drain
+                # write them once Postgres is back
+                self.spool.append(
+                    pa_request_id,
+                    {"pa_request_id": pa_request_id, "trace_id": trace_id, "prepared": prepared},
+                )
+                logger.warning(
+                    f"Database unavailable ({e}), spooled {len(prepared)} "
+                    f"results for PA request {pa_request_id}"
+                )
+                return failures
 
-            latency_ms = int((time.time() - start_time) * 1000)
-
-            # STEP E: Store extracted evidence + decision
-            logger.info(f"Storing extracted evidence for evidence pack {evidence_pack_id}")
-            self.evidence_repo.insert_extracted_evidence(
-                evidence_pack_id=evidence_pack_id,
-                diagnosis=evidence.get("diagnosis", {}).get("value"),
-                imaging_present=evidence.get("imaging_present", {}).get("value"),
-                therapy_attempted=evidence.get("conservative_therapy", {}).get("attempted"),
-                functional_limitation=evidence.get("functional_limitation", {}).get("value"),
-                missing_fields=evidence.get("missing_fields"),
-                sources={
-                    "diagnosis": evidence.get("diagnosis", {}).get("source"),
-                    "conservative_therapy": evidence.get("conservative_therapy", {}).get("source"),
-                    "imaging_present": evidence.get("imaging_present", {}).get("source"),
-                    "functional_limitation": evidence.get("functional_limitation", {}).get("source"),
-                },
-                document_id=document_id
-            )
+            for item in prepared:
+                self._fail(item["job"], e)
+                failures[item["job"]["job_uuid"]] = e
 
+        return failures
 
-            
-            logger.info(f"Updating evidence pack decision for evidence pack {evidence_pack_id}")
-            self.evidence_repo.update_evidence_pack_decision(
-                evidence_pack_id=evidence_pack_id,
-                decision=policy_result["decision"],
-                explanation=policy_result["explanation"],
-                sources={
-                    "diagnosis": evidence.get("diagnosis", {}).get("source"),
-                    "conservative_therapy": evidence.get("conservative_therapy", {}).get("source"),
-                    "imaging_present": evidence.get("imaging_present", {}).get("source"),
-                    "functional_limitation": evidence.get("functional_limitation", {}).get("source"),
-                },
-                metadata={
-                    "missing_requirements": policy_result["missing_requirements"],
-                    "attempt": attempt_count,
-                    "latency_ms": latency_ms,
-                    "trace_id": trace_id,
-                    "policy": "TKA_v1",
-                },
+    def drain_spool(self, spool, limit: int) -> int:
+        # Replays spooled results, oldest first, one finalize per PA request.
+        # Every write in _finalize is idempotent (evidence replaced per
+        # document, criteria merged per document, decision version-guarded),
+        # so an entry replayed twice after a crash converges to the same pack.
+        entries = spool.peek(limit)
+        superseded = self.processing_jobs_repo.superseded_documents([
+            item["job"]["job_uuid"]
+            for _, entry in entries
+            for item in entry["prepared"]
+        ])
+
+        groups: dict[int, list[tuple[int, dict]]] = {}
+        for spool_id, entry in entries:
+            groups.setdefault(entry["pa_request_id"], []).append((spool_id, entry))
+
+        drained = 0
+        for pa_request_id, group in groups.items():
+            items = [item for _, entry in group for item in entry["prepared"]]
+            # Latest result per document wins; documents another job has
+            # finished since are left alone
+            latest = {
+                item["job"]["document_id"]: item
+                for item in items
+                if item["job"]["document_id"] not in superseded
+            }
+
+            try:
+                if latest:
+                    self._finalize(
+                        pa_request_id,
+                        list(latest.values()),
+                        group[0][1]["trace_id"],
+                        time.time(),
+                    )
+                for item in items:
+                    if latest.get(item["job"]["document_id"]) is not item:
+                        self.processing_jobs_repo.mark_success(item["job"]["job_uuid"])
+            except Exception as e:
+                if is_db_unavailable(e):
+                    raise
+                logger.error(f"Failed to replay spooled results for PA request {pa_request_id}: {e}")
+                quarantined = spool.fail([spool_id for spool_id, _ in group], str(e))
+                if quarantined:
+                    logger.error(
+                        f"Quarantined {quarantined} spooled results for PA request "
+                        f"{pa_request_id} in {spool.path} after {spool.max_attempts} attempts"
+                    )
+                continue
+
+            spool.delete([spool_id for spool_id, _ in group])
+            drained += len(group)
+
+        return drained
+
+    def _prepare(self, job: dict) -> dict:
+        document_id = job["document_id"]
+        logger.info(f"Processing job_uuid: {job['job_uuid']} for document_id: {document_id}")
+
+        logger.info(f"Fetching text for document {document_id}")
+        text = self.documents_repo.fetch_document_text(document_id)
+        logger.info(f"Fetched text for document {document_id}")
+        if not text:
+            raise Exception("Document text not found")
+
+        # STEP B: Deterministic extraction
+        logger.info(f"Extracting evidence from document {document_id}")
+        evidence = self.extractor.extract(text)
+
+        if self.recorder:
+            self.recorder.record(job, text, evidence)
+
+        return {"job": job, "evidence": evidence}
+
+    def _finalize(
+        self,
+        pa_request_id: int,
+        prepared: list[dict],
+        trace_id: str,
+        start_time: float,
+    ):
+        document_ids = [item["job"]["document_id"] for item in prepared]
+        attempt_count = max(item["job"].get("attempt", 1) for item in prepared)
+
+        # STEP C: Evidence pack (idempotent)
+        logger.info(f"Creating/updating evidence pack for PA request {pa_request_id}")
+        evidence_pack_id = self.evidence_repo.create_or_get_evidence_pack(
+            pa_request_id
+        )
+
+        # STEP D: Store extracted evidence for every document in one transaction
+        logger.info(f"Storing extracted evidence for evidence pack {evidence_pack_id}")
+        self.evidence_repo.replace_extracted_evidence_many(
+            evidence_pack_id=evidence_pack_id,
+            rows=[
+                self._evidence_row(item["job"]["document_id"], item["evidence"])
+                for item in prepared
+            ],
+        )
+
+        # STEP E: Merge into per-PA criterion state and evaluate across all documents.
+        # The cached pack is dropped first so readers fall back to Postgres
+        # until the re-evaluated pack is published.
+        self.pack_cache.invalidate(pa_request_id)
+        logger.info(f"Merging evidence into criteria state for evidence pack {evidence_pack_id}")
+        criteria_state, state_version = self.evidence_repo.merge_criteria_state(
+            evidence_pack_id,
+            {
+                str(item["job"]["document_id"]): self.aggregator.contribution(item["evidence"])
+                for item in prepared
+            },
+        )
+        merged = self.aggregator.merge(criteria_state)
+
+        logger.info(f"Evaluating policy for PA request {pa_request_id}")
+        policy_result = self.policy.evaluate_tka(merged)
+
+        latency_ms = int((time.time() - start_time) * 1000)
+
+        if policy_result["decision"] == "APPROVE":
+            pa_status = PaRequestStatus.EVIDENCE_READY
+            pa_status_unless = (PaRequestStatus.EVIDENCE_READY, PaRequestStatus.DECIDED)
+            status_audit = (AuditAction.EVIDENCE_READY, None)
+        else:
+            pa_status = "NEEDS_MORE_INFO"
+            pa_status_unless = ("NEEDS_MORE_INFO",)
+            status_audit = (
+                AuditAction.PA_NEEDS_MORE_INFO,
+                {"missing": policy_result["missing_requirements"]},
             )
 
-            # Audit: evidence pack created
-            logger.info(f"Logging audit for evidence pack {evidence_pack_id}")
-            self.audit_repo.log(
-                pa_request_id=pa_request_id,
-                action=AuditAction.EVIDENCE_PACK_CREATED,
-                metadata={
+        # Decision, PA request status and audit rows commit together, and
+        # only for the current state_version, so a slower worker holding an
+        # older version can't flip the status back
+        logger.info(
+            f"Updating evidence pack decision and PA request {pa_request_id} "
+            f"status for evidence pack {evidence_pack_id}"
+        )
+        updated = self.evidence_repo.finalize_evidence_pack(
+            evidence_pack_id=evidence_pack_id,
+            pa_request_id=pa_request_id,
+            decision=policy_result["decision"],
+            explanation=policy_result["explanation"],
+            sources=self._sources(merged),
+            metadata={
+                "missing_requirements": policy_result["missing_requirements"],
+                "attempt": attempt_count,
+                "latency_ms": latency_ms,
+                "trace_id": trace_id,
+                "policy": "TKA_v1",
+                "documents": len(criteria_state),
+                "coalesced_documents": len(prepared),
+                "state_version": state_version,
+            },
+            state_version=state_version,
+            pa_status=pa_status,
+            pa_status_unless=pa_status_unless,
+            audit_logs=[
+                (
+                    AuditAction.EVIDENCE_PACK_CREATED,
+                    {
+                        "evidence_pack_id": evidence_pack_id,
+                        "decision": policy_result["decision"],
+                        "document_ids": document_ids,
+                    },
+                ),
+                status_audit,
+            ],
+        )
+
+        if updated:
+            self.pack_cache.publish(
+                pa_request_id,
+                state_version,
+                {
+                    "pa_request_id": pa_request_id,
                     "evidence_pack_id": evidence_pack_id,
+                    "status": EvidencePackStatus.FINALIZED,
                     "decision": policy_result["decision"],
+                    "explanation": policy_result["explanation"],
+                    "sources": self._sources(merged),
+                    "missing_requirements": policy_result["missing_requirements"],
+                    "documents": len(criteria_state),
+                    "version": state_version,
+                    "finalized_at": time.time(),
                 },
             )
+        else:
+            # A newer document was merged meanwhile; its job writes the decision
+            logger.info(
+                f"Evidence pack {evidence_pack_id} moved past version "
+                f"{state_version}, skipping decision for documents {document_ids}"
+            )
 
-            # Update PA request status
-            logger.info(f"Updating PA request {pa_request_id} status based on policy decision")
-            if policy_result["decision"] == "APPROVE":
-                self.pa_requests_repo.mark_evidence_ready(pa_request_id)
-                self.audit_repo.log(
-                    pa_request_id=pa_request_id,
-                    action=AuditAction.EVIDENCE_READY,
-                )
-            else:
-                self.pa_requests_repo.mark_needs_more_info(pa_request_id)
-                self.audit_repo.log(
-                    pa_request_id=pa_request_id,
-                    action=AuditAction.PA_NEEDS_MORE_INFO,
-                    metadata={
-                        "missing": policy_result["missing_requirements"]
-                    },
-                )
+        # Processing job success
+        for item in prepared:
+            self.processing_jobs_repo.mark_success(item["job"]["job_uuid"])
 
-            # Processing job success
-            self.processing_jobs_repo.mark_success(job_uuid)
+        logger.info(f"Documents {document_ids} processed successfully")
 
-            logger.info(f"Document {document_id} processed successfully")
+    def _fail(self, job: dict, error: Exception):
+        document_id = job["document_id"]
+        pa_request_id = job["pa_request_id"]
 
-        except Exception as e:
-            logger.error(f"Failed processing document {document_id}: {e}")
+        logger.error(f"Failed processing document {document_id}: {error}")
 
-            self.documents_repo.update_document_status(
-                document_id,
-                DocumentStatus.FAILED,
-            )
+        self.documents_repo.update_document_status(
+            document_id,
+            DocumentStatus.FAILED,
+        )
 
-            self.pa_requests_repo.mark_processing_failed(pa_request_id)
+        self.pa_requests_repo.mark_processing_failed(pa_request_id)
 
-            self.processing_jobs_repo.mark_failed(job_uuid, str(e))
+        self.processing_jobs_repo.mark_failed(job["job_uuid"], str(error))
 
-            self.audit_repo.log(
-                pa_request_id=pa_request_id,
-                action=AuditAction.DOCUMENT_PROCESSING_FAILED,
-                metadata={
-                    "document_id": document_id,
-                    "error": str(e),
-                },
-            )
+        self.audit_repo.log(
+            pa_request_id=pa_request_id,
+            action=AuditAction.DOCUMENT_PROCESSING_FAILED,
+            metadata={
+                "document_id": document_id,
+                "error": str(error),
+            },
+        )
+
+    def _evidence_row(self, document_id: int, evidence: dict) -> dict:
+        return {
+            "diagnosis": (evidence.get("diagnosis") or {}).get("value"),
+            "imaging_present": (evidence.get("imaging_present") or {}).get("value"),
+            "therapy_attempted": (evidence.get("conservative_therapy") or {}).get("attempted"),
+            "functional_limitation": (evidence.get("functional_limitation") or {}).get("value"),
+            "missing_fields": evidence.get("missing_fields"),
+            "sources": self._sources(evidence),
+            "document_id": document_id,
+        }
 
-            raise
\ No newline at end of file
+    def _sources(self, evidence: dict) -> dict:
+        return {
+            "diagnosis": (evidence.get("diagnosis") or {}).get("source"),
+            "conservative_therapy": (evidence.get("conservative_therapy") or {}).get("source"),
+            "imaging_present": (evidence.get("imaging_present") or {}).get("source"),
+            "functional_limitation": (evidence.get("functional_limitation") or {}).get("source"),
+        }
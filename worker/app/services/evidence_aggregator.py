@@ -0,0 +1,60 @@
+from typing import Dict
+
+from app.services.evidence_extractor import CRITERIA_PATTERNS
+
+# Name each criterion is reported under in missing_fields
+MISSING_FIELD_NAMES = {
+    "diagnosis": "diagnosis",
+    "conservative_therapy": "conservative_therapy",
+    "imaging_present": "imaging",
+    "functional_limitation": "functional_limitation",
+}
+
+
+class EvidenceAggregator:
+    # Per-PA criterion state is a map of document_id -> that document's
+    # criterion evidence. A new document only adds (or replaces) its own
+    # entry, so earlier documents are never re-read or re-extracted.
+
+    def contribution(self, evidence: Dict) -> Dict:
+        return {
+            criterion: evidence.get(criterion)
+            for criterion in CRITERIA_PATTERNS
+        }
+
+    def merge(self, criteria_state: Dict) -> Dict:
+        merged = {criterion: None for criterion in CRITERIA_PATTERNS}
+        merged["missing_fields"] = []
+
+        for document_id in sorted(criteria_state, key=int):
+            contribution = criteria_state[document_id]
+
+            for criterion in CRITERIA_PATTERNS:
+                entry = contribution.get(criterion)
+                if not entry:
+                    continue
+
+                sources = [
+                    {**src, "document_id": int(document_id)}
+                    for src in entry.get("source") or []
+                ]
+
+                current = merged[criterion]
+                if current is None:
+                    merged[criterion] = {**entry, "source": sources}
+                    continue
+
+                current["source"] = current["source"] + sources
+                current["confidence"] = max(
+                    current.get("confidence", 0), entry.get("confidence", 0)
+                )
+                if "types" in entry:
+                    current["types"] = sorted(
+                        set(current.get("types", [])) | set(entry["types"])
+                    )
+
+        for criterion in CRITERIA_PATTERNS:
+            if merged[criterion] is None:
+                merged["missing_fields"].append(MISSING_FIELD_NAMES[criterion])
+
+        return merged
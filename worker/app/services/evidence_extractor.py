@@ -1,11 +1,204 @@
+import multiprocessing
+import os
 import re
-from typing import Dict, List
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List
+
+from app.utils import deadline
+
+CRITERIA_PATTERNS = {
+    "diagnosis": r"osteoarthritis",
+    "conservative_therapy": r"physiotherapy|physical therapy|NSAID|ibuprofen|naproxen",
+    "imaging_present": r"x-ray|MRI|CT scan",
+    "functional_limitation": r"difficulty walking|pain with daily activities|ADL",
+}
+
+# Compiled at import so a warmed prefork parent hands them to every child
+COMPILED_PATTERNS = {
+    criterion: re.compile(pattern, re.IGNORECASE)
+    for criterion, pattern in CRITERIA_PATTERNS.items()
+}
+
+PARALLEL_THRESHOLD_BYTES = int(
+    os.getenv("EXTRACT_PARALLEL_THRESHOLD_BYTES", 1024 * 1024)
+)
+CHUNK_BYTES = int(os.getenv("EXTRACT_CHUNK_BYTES", 256 * 1024))
+# Each prefork child owns a pool, so by default they split the cores
+# between them rather than each starting one process per core
+POOL_WORKERS = int(
+    os.getenv(
+        "EXTRACT_POOL_WORKERS",
+        max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WORKER_PROCESSES") or 1))),
+    )
+)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Started lazily, after the queue heartbeat and spool drain threads, so
+    # pool processes come from a forkserver rather than forking a threaded
+    # worker and inheriting locks those threads may hold
+    global _pool
+    if _pool is None:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=context)
+    return _pool
+
+
+def _kill_pool():
+    # A chunk stuck in a regex cannot be cancelled; drop the whole pool
+    # and let the next large note start a fresh one
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def _match_chunk(shm_name: str, start: int, end: int, first_line: int, last: bool) -> Dict:
+    # Runs in a pool process: reads its slice straight out of shared memory
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        text = bytes(shm.buf[start:end]).decode("utf-8")
+    finally:
+        shm.close()
+
+    lines = text.split("\n")
+    if not last:
+        # Chunks end on a newline, so the trailing empty piece belongs to the next chunk
+        lines.pop()
+
+    return {
+        criterion: _match_lines(lines, pattern, first_line)
+        for criterion, pattern in COMPILED_PATTERNS.items()
+    }
+
+
+def _match_lines(lines: List[str], pattern: re.Pattern, first_line: int = 1) -> List[Dict]:
+    matches = []
+    for idx, line in enumerate(lines):
+        if idx % 4096 == 0:
+            deadline.check("extraction")
+        if pattern.search(line):
+            matches.append({
+                "line_number": idx + first_line,
+                "text_snippet": line.strip(),
+            })
+    return matches
+
+
+def _chunk_bounds(data: bytes, chunk_bytes: int) -> List[tuple]:
+    # Splits on newline bytes only, which never occur inside a multi-byte UTF-8 sequence
+    bounds = []
+    start = 0
+    line = 1
+    while start < len(data):
+        end = data.find(b"\n", start + chunk_bytes)
+        end = len(data) if end == -1 else end + 1
+        bounds.append((start, end, line))
+        line += data.count(b"\n", start, end)
+        start = end
+    return bounds
 
 
 class EvidenceExtractor:
     def extract(self, note_text: str) -> Dict:
-        lines = note_text.split("\n")
+        # UTF-8 is at most 4 bytes per character, so most notes are known to
+        # be under the threshold without encoding them
+        data = None
+        if len(note_text) * 4 >= PARALLEL_THRESHOLD_BYTES:
+            data = note_text.encode("utf-8")
+
+        if data is not None and len(data) >= PARALLEL_THRESHOLD_BYTES:
+            matches = self._match_parallel(data)
+        else:
+            lines = note_text.split("\n")
+            matches = {
+                criterion: _match_lines(lines, pattern)
+                for criterion, pattern in COMPILED_PATTERNS.items()
+            }
+
+        return self._build(matches)
+
+    def extract_many(self, notes: Iterable[str]) -> Dict:
+        # Columnar extraction for backfills and analytics. Per-note arrays
+        # are shaped (notes, criteria) in the order of `criteria`:
+        #   present       bool   any line matched
+        #   match_counts  int32  number of matching lines (len of "source")
+        #   first_line    int32  first matching line, 0 when absent
+        # `spans` has one row per regex match; start/end are column offsets
+        # within the line.
+        import numpy as np
+
+        criteria = tuple(COMPILED_PATTERNS)
+        counts = array("i")
+        first_lines = array("i")
+        span_note, span_criterion, span_line = array("i"), array("i"), array("i")
+        span_start, span_end = array("i"), array("i")
+
+        for note_index, text in enumerate(notes):
+            for criterion_index, pattern in enumerate(COMPILED_PATTERNS.values()):
+                line_count = 0
+                first_line = 0
+                last_line = 0
+                line = 1
+                line_start = 0
+                position = 0
 
+                # Patterns never cross a newline, so whole-text matches land
+                # on the same lines the per-line search reports
+                for m in pattern.finditer(text):
+                    start = m.start()
+                    newlines = text.count("\n", position, start)
+                    if newlines:
+                        line += newlines
+                        line_start = text.rindex("\n", position, start) + 1
+                    position = start
+
+                    if line != last_line:
+                        line_count += 1
+                        first_line = first_line or line
+                        last_line = line
+
+                    span_note.append(note_index)
+                    span_criterion.append(criterion_index)
+                    span_line.append(line)
+                    span_start.append(start - line_start)
+                    span_end.append(m.end() - line_start)
+
+                counts.append(line_count)
+                first_lines.append(first_line)
+
+        shape = (len(counts) // len(criteria), len(criteria))
+        match_counts = np.frombuffer(counts, dtype=np.intc).astype(np.int32).reshape(shape)
+
+        return {
+            "criteria": criteria,
+            "present": match_counts > 0,
+            "match_counts": match_counts,
+            "first_line": np.frombuffer(first_lines, dtype=np.intc).astype(np.int32).reshape(shape),
+            "spans": {
+                name: np.frombuffer(column, dtype=np.intc).astype(np.int32)
+                for name, column in (
+                    ("note_index", span_note),
+                    ("criterion", span_criterion),
+                    ("line_number", span_line),
+                    ("start", span_start),
+                    ("end", span_end),
+                )
+            },
+        }
+
+    def _build(self, matches: Dict[str, List[Dict]]) -> Dict:
         evidence = {
             "diagnosis": None,
             "conservative_therapy": None,
@@ -15,9 +208,7 @@ class EvidenceExtractor:
         }
 
         # Diagnosis
-        diagnosis_sources = self._match_lines(
-            lines, r"osteoarthritis"
-        )
+        diagnosis_sources = matches["diagnosis"]
 
         if diagnosis_sources:
             evidence["diagnosis"] = {
@@ -29,9 +220,7 @@ class EvidenceExtractor:
             evidence["missing_fields"].append("diagnosis")
 
         # Conservative Therapy
-        therapy_sources = self._match_lines(
-            lines, r"physiotherapy|physical therapy|NSAID|ibuprofen|naproxen"
-        )
+        therapy_sources = matches["conservative_therapy"]
 
         therapy_types = []
         for src in therapy_sources:
@@ -52,9 +241,7 @@ class EvidenceExtractor:
             evidence["missing_fields"].append("conservative_therapy")
 
         # Imaging
-        imaging_sources = self._match_lines(
-            lines, r"x-ray|MRI|CT scan"
-        )
+        imaging_sources = matches["imaging_present"]
 
         if imaging_sources:
             evidence["imaging_present"] = {
@@ -66,9 +253,7 @@ class EvidenceExtractor:
             evidence["missing_fields"].append("imaging")
 
         # Functional Limitation
-        limitation_sources = self._match_lines(
-            lines, r"difficulty walking|pain with daily activities|ADL"
-        )
+        limitation_sources = matches["functional_limitation"]
 
         if limitation_sources:
             evidence["functional_limitation"] = {
@@ -82,15 +267,44 @@ class EvidenceExtractor:
         return self._validate(evidence)
 
     # Helpers
-    def _match_lines(self, lines: List[str], pattern: str) -> List[Dict]:
-        matches = []
-        for idx, line in enumerate(lines):
-            if re.search(pattern, line, re.IGNORECASE):
-                matches.append({
-                    "line_number": idx + 1,
-                    "text_snippet": line.strip(),
-                })
-        return matches
+    def _match_parallel(self, data: bytes) -> Dict[str, List[Dict]]:
+        bounds = _chunk_bounds(data, CHUNK_BYTES)
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        try:
+            shm.buf[:len(data)] = data
+            pool = _get_pool()
+            futures = [
+                pool.submit(
+                    _match_chunk,
+                    shm.name,
+                    start,
+                    end,
+                    first_line,
+                    idx == len(bounds) - 1,
+                )
+                for idx, (start, end, first_line) in enumerate(bounds)
+            ]
+
+            # Chunks are in document order, so concatenating keeps line order.
+            # This (consuming) thread waits for them, bounded by the document's
+            # deadline; the heartbeat and spool drain threads keep running.
+            matches = {criterion: [] for criterion in CRITERIA_PATTERNS}
+            for future in futures:
+                left = deadline.remaining()
+                try:
+                    result = future.result(timeout=None if left is None else max(left, 0))
+                except TimeoutError:
+                    _kill_pool()
+                    raise deadline.timeout_error("extraction")
+                except BrokenProcessPool:
+                    _kill_pool()
+                    raise
+                for criterion, sources in result.items():
+                    matches[criterion].extend(sources)
+            return matches
+        finally:
+            shm.close()
+            shm.unlink()
 
     def _validate(self, evidence: Dict) -> Dict:
         if "missing_fields" not in evidence:
@@ -0,0 +1,62 @@
+import json
+import os
+
+from app.utils import deadline
+from app.utils.logger import logger
+
+# Only replaces the cached pack with a strictly newer state_version.
+# KEYS: pack key | ARGV: version, pack, ttl
+PUBLISH_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'pack', ARGV[2])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+
+
+class EvidencePackCache:
+    # Read-through copy of finalized evidence packs for status polling.
+    # Postgres stays the source of truth: cache failures are logged and
+    # never fail the job.
+
+    def __init__(self, redis=None):
+        self.redis = redis
+        self.prefix = os.getenv("EVIDENCE_PACK_CACHE_PREFIX", "evidence_pack")
+        self.ttl = int(os.getenv("EVIDENCE_PACK_CACHE_TTL_SECONDS", 3600))
+        self._publish = redis.register_script(PUBLISH_SCRIPT) if redis else None
+
+    def key(self, pa_request_id: int) -> str:
+        return f"{self.prefix}:{pa_request_id}"
+
+    def publish(self, pa_request_id: int, version: int, pack: dict):
+        # Past the job deadline the pack stays uncached (it was invalidated
+        # before the merge) and readers fall back to Postgres
+        if self.redis is None or deadline.expired():
+            return
+
+        try:
+            self._publish(
+                keys=[self.key(pa_request_id)],
+                args=[version, json.dumps(pack, default=str), self.ttl],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache evidence pack for PA request {pa_request_id}: {e}")
+
+    def invalidate(self, pa_request_id: int):
+        if self.redis is None:
+            return
+
+        # Drops the pack but keeps its version, so a slower publish of an
+        # older state still fails the version check; the TTL is refreshed so
+        # the version outlives the in-flight publishes
+        key = self.key(pa_request_id)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hdel(key, "pack")
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to invalidate evidence pack cache for PA request {pa_request_id}: {e}")
@@ -1,3 +1,12 @@
+# Criteria (as named in extract_many columns) that TKA approval requires
+TKA_REQUIRED_CRITERIA = (
+    "diagnosis",
+    "imaging_present",
+    "conservative_therapy",
+    "functional_limitation",
+)
+
+
 class PolicyEvaluator:
     def evaluate_tka(self, evidence: dict) -> dict:
         missing = []
@@ -26,3 +35,9 @@ class PolicyEvaluator:
             "explanation": "All medical necessity criteria met",
             "missing_requirements": [],
         }
+
+    def evaluate_tka_many(self, columns: dict):
+        # Vectorized counterpart of evaluate_tka over extract_many output:
+        # returns a bool array, True where the note would be APPROVE
+        required = [columns["criteria"].index(c) for c in TKA_REQUIRED_CRITERIA]
+        return columns["present"][:, required].all(axis=1)
@@ -0,0 +1,179 @@
+import fcntl
+import glob
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from app.utils.logger import logger
+
+
+class ResultSpool:
+    # Local append-only store for extracted group results whose finalize hit
+    # a Postgres outage. The jobs are acked once spooled, so this file is
+    # their only copy until drained: RESULT_SPOOL_DIR should be a persistent
+    # volume. Each worker appends to its own file; drainers take over every
+    # file in the directory under a lock, so results spooled by a worker
+    # that never comes back (e.g. a new hostname) are still replayed.
+    # Entries that keep failing to replay for reasons other than an outage
+    # are moved to quarantined_results so they stop blocking newer ones.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.max_attempts = int(os.getenv("RESULT_SPOOL_MAX_ATTEMPTS", 5))
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spooled_results (
+              id            INTEGER PRIMARY KEY AUTOINCREMENT,
+              pa_request_id INTEGER NOT NULL,
+              payload       TEXT NOT NULL,
+              created_at    REAL NOT NULL,
+              attempts      INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(spooled_results)")]
+        if "attempts" not in columns:
+            # Spool files written before replay attempts were counted
+            conn.execute(
+                "ALTER TABLE spooled_results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0"
+            )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quarantined_results (
+              id             INTEGER PRIMARY KEY,
+              pa_request_id  INTEGER NOT NULL,
+              payload        TEXT NOT NULL,
+              created_at     REAL NOT NULL,
+              attempts       INTEGER NOT NULL,
+              last_error     TEXT,
+              quarantined_at REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def from_env(cls, worker_id: str) -> "ResultSpool | None":
+        spool_dir = os.getenv("RESULT_SPOOL_DIR")
+        if not spool_dir:
+            return None
+
+        path = os.path.join(spool_dir, f"results-{worker_id.replace('/', '_')}.db")
+        logger.info(f"Spooling results to {path} during database outages")
+        return cls(path)
+
+    def spools(self) -> list["ResultSpool"]:
+        # This spool and every other worker's in the same directory
+        spool_dir = os.path.dirname(self.path) or "."
+        return [
+            self if path == self.path else ResultSpool(path)
+            for path in sorted(glob.glob(os.path.join(spool_dir, "results-*.db")))
+        ]
+
+    @contextmanager
+    def drain_lock(self):
+        # Yields False while another drainer holds this file
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, pa_request_id: int, payload: dict):
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO spooled_results (pa_request_id, payload, created_at)
+            VALUES (?, ?, ?)
+            """,
+            (pa_request_id, json.dumps(payload, default=str), time.time()),
+        )
+        conn.commit()
+        conn.close()
+
+    def peek(self, limit: int) -> list[tuple[int, dict]]:
+        conn = self._connect()
+        rows = conn.execute(
+            """
+            SELECT id, payload
+            FROM spooled_results
+            ORDER BY id
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        conn.close()
+
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def delete(self, ids: list[int]):
+        conn = self._connect()
+        conn.executemany(
+            "DELETE FROM spooled_results WHERE id = ?",
+            [(spool_id,) for spool_id in ids],
+        )
+        conn.commit()
+        conn.close()
+
+    def fail(self, ids: list[int], error: str) -> int:
+        # Counts a failed replay; entries out of attempts are quarantined.
+        # Returns how many were quarantined.
+        conn = self._connect()
+        conn.executemany(
+            "UPDATE spooled_results SET attempts = attempts + 1 WHERE id = ?",
+            [(spool_id,) for spool_id in ids],
+        )
+        placeholders = ", ".join("?" for _ in ids)
+        exhausted = [
+            row[0]
+            for row in conn.execute(
+                f"""
+                SELECT id
+                FROM spooled_results
+                WHERE id IN ({placeholders})
+                  AND attempts >= ?
+                """,
+                (*ids, self.max_attempts),
+            )
+        ]
+        for spool_id in exhausted:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO quarantined_results
+                  (id, pa_request_id, payload, created_at, attempts, last_error, quarantined_at)
+                SELECT id, pa_request_id, payload, created_at, attempts, ?, ?
+                FROM spooled_results
+                WHERE id = ?
+                """,
+                (error, time.time(), spool_id),
+            )
+            conn.execute("DELETE FROM spooled_results WHERE id = ?", (spool_id,))
+        conn.commit()
+        conn.close()
+
+        return len(exhausted)
+
+    def count(self) -> int:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM spooled_results").fetchone()[0]
+        conn.close()
+        return count
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Each commit is on disk before the job is acked
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from psycopg2.errors import QueryCanceled
+from psycopg2.extras import RealDictCursor
+
+from app.utils import deadline
+from app.utils.logger import logger
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 0))
+
+_scope: ContextVar["DbScope | None"] = ContextVar("db_scope", default=None)
+
+
+class DbScope:
+    # Statements and connections issued while handling one job group,
+    # keyed by the repository method that ran them.
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.connections = 0
+        self.acquire_ms = 0.0
+        self.statements = 0
+        self.query_ms = 0.0
+        self.queries: dict[str, dict] = {}
+
+    def record_query(self, name: str, elapsed_ms: float, rows: int):
+        stats = self.queries.setdefault(
+            name, {"calls": 0, "ms": 0.0, "max_ms": 0.0, "rows": 0}
+        )
+        stats["calls"] += 1
+        stats["ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["rows"] += max(rows, 0)
+
+        self.statements += 1
+        self.query_ms += elapsed_ms
+
+    def summary(self) -> str:
+        top = sorted(self.queries.items(), key=lambda item: item[1]["ms"], reverse=True)
+        queries = ", ".join(
+            f"{name} {stats['calls']}x {stats['ms']:.1f}ms "
+            f"(max {stats['max_ms']:.1f}ms) rows={stats['rows']}"
+            for name, stats in top
+        )
+        totals = (
+            f"DB jobs={self.jobs} statements={self.statements} "
+            f"connections={self.connections} acquire={self.acquire_ms:.1f}ms "
+            f"query={self.query_ms:.1f}ms"
+        )
+        return f"{totals} | {queries}" if queries else totals
+
+
+@contextmanager
+def job_scope(jobs: int = 1):
+    scope = DbScope(jobs)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+        logger.info(scope.summary())
+
+
+def record_connection(acquire_ms: float):
+    scope = _scope.get()
+    if scope is not None:
+        scope.connections += 1
+        scope.acquire_ms += acquire_ms
+
+
+def _query_name() -> str:
+    # First caller outside psycopg2 and this module, e.g.
+    # "EvidenceRepository.merge_criteria_state"
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module != __name__ and not module.startswith("psycopg2"):
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return "unknown"
+
+
+def _record(name: str, start: float, rows: int):
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    scope = _scope.get()
+    if scope is not None:
+        scope.record_query(name, elapsed_ms, rows)
+
+    # Name only: statement text and parameters can carry PHI
+    if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(f"Slow query {name} took {elapsed_ms:.1f}ms rows={rows}")
+
+
+class InstrumentedCursor(RealDictCursor):
+    # Inside a job deadline each statement runs with statement_timeout set
+    # to the remaining budget, and a cancelled statement surfaces as
+    # JobTimeoutError.
+
+    def execute(self, query, vars=None):
+        name = _query_name()
+        query = self._bound(name, query)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except QueryCanceled as e:
+            if deadline.remaining() is None:
+                raise
+            raise deadline.timeout_error(name) from e
+        finally:
+            _record(name, start, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        name = _query_name()
+        query = self._bound(name, query)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        except QueryCanceled as e:
+            if deadline.remaining() is None:
+                raise
+            raise deadline.timeout_error(name) from e
+        finally:
+            _record(name, start, self.rowcount)
+
+    def _bound(self, name: str, query):
+        timeout_ms = deadline.statement_timeout_ms()
+        if timeout_ms is None:
+            return query
+
+        deadline.check(name)
+        # SET LOCAL lasts until commit; prefixing it saves a round trip
+        prefix = f"SET LOCAL statement_timeout = {timeout_ms}; "
+        if isinstance(query, bytes):
+            return prefix.encode() + query
+        if isinstance(query, str):
+            return prefix + query
+
+        super().execute(prefix)
+        return query
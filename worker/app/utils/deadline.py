@@ -0,0 +1,62 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", 60))
+
+_deadline: ContextVar[tuple[float, str] | None] = ContextVar("job_deadline", default=None)
+
+
+class JobTimeoutError(Exception):
+    pass
+
+
+@contextmanager
+def job_deadline(
+    seconds: float = JOB_DEADLINE_SECONDS,
+    label: str = "job",
+    started_at: float | None = None,
+):
+    # Database statements, extraction and cache calls made inside check the
+    # remaining budget; 0 disables the deadline. started_at (time.monotonic)
+    # lets several blocks share one budget counted from when the job was
+    # popped.
+    if started_at is None:
+        started_at = time.monotonic()
+    token = _deadline.set((started_at + seconds, label) if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current[0] - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(stage: str):
+    if expired():
+        raise timeout_error(stage)
+
+
+def timeout_error(stage: str) -> JobTimeoutError:
+    current = _deadline.get()
+    label = current[1] if current else "job"
+    return JobTimeoutError(f"{label} deadline exceeded during {stage}")
+
+
+def statement_timeout_ms() -> int | None:
+    left = remaining()
+    if left is None:
+        return None
+    return max(1, math.ceil(left * 1000))
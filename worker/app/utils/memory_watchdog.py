@@ -0,0 +1,113 @@
+import os
+import random
+import resource
+import signal
+import time
+import tracemalloc
+
+from app.utils.logger import logger
+
+
+class MemoryWatchdog:
+    # Tracks RSS and decides when a long-lived worker should retire so its
+    # supervisor (prefork parent or container runtime) replaces it.
+    # With TRACEMALLOC_FRAMES set, snapshot diffs are taken periodically;
+    # kill -USR2 <pid> writes the latest diff to MEMORY_DUMP_DIR.
+
+    def __init__(self):
+        max_jobs = int(os.getenv("MAX_JOBS_PER_CHILD", 0))
+        jitter = int(os.getenv("MAX_JOBS_PER_CHILD_JITTER", 0))
+        # Jitter keeps sibling workers from all retiring at the same moment
+        self.max_jobs = max_jobs + random.randint(0, jitter) if max_jobs else 0
+        self.ceiling_mb = float(os.getenv("MEMORY_CEILING_MB", 0))
+        self.snapshot_every = int(os.getenv("TRACEMALLOC_SNAPSHOT_EVERY_JOBS", 100))
+        self.dump_dir = os.getenv("MEMORY_DUMP_DIR", "/tmp/worker-memory")
+
+        self.jobs = 0
+        self.baseline_snapshot = None
+        self.last_snapshot = None
+        self.last_diff = []
+
+        frames = int(os.getenv("TRACEMALLOC_FRAMES", 0))
+        if frames > 0:
+            tracemalloc.start(frames)
+            self.baseline_snapshot = tracemalloc.take_snapshot()
+            self.last_snapshot = self.baseline_snapshot
+
+        signal.signal(signal.SIGUSR2, self._on_signal)
+
+    def rss_mb(self) -> float:
+        try:
+            with open("/proc/self/statm") as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except OSError:
+            # No procfs: peak RSS is the best available (KiB on Linux)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def after_jobs(self, count: int):
+        previous = self.jobs
+        self.jobs += count
+
+        if self.last_snapshot is not None and (
+            self.jobs // self.snapshot_every > previous // self.snapshot_every
+        ):
+            self._take_snapshot()
+
+    def retire_reason(self) -> str | None:
+        if self.max_jobs and self.jobs >= self.max_jobs:
+            return f"processed {self.jobs} jobs (limit {self.max_jobs})"
+
+        if self.ceiling_mb:
+            rss = self.rss_mb()
+            if rss >= self.ceiling_mb:
+                return f"RSS {rss:.0f}MB reached ceiling {self.ceiling_mb:.0f}MB"
+
+        return None
+
+    def dump(self) -> str | None:
+        path = os.path.join(
+            self.dump_dir,
+            f"memory-{os.getpid()}-{int(time.time() * 1000)}.txt",
+        )
+
+        lines = [f"pid={os.getpid()} jobs={self.jobs} rss_mb={self.rss_mb():.1f}"]
+        if self.last_snapshot is not None:
+            self._take_snapshot()
+            lines.append("")
+            lines.append("Growth since previous snapshot:")
+            lines.extend(str(stat) for stat in self.last_diff)
+            lines.append("")
+            lines.append("Growth since start:")
+            lines.extend(
+                str(stat)
+                for stat in self.last_snapshot.compare_to(
+                    self.baseline_snapshot, "lineno"
+                )[:25]
+            )
+        else:
+            lines.append("tracemalloc disabled (set TRACEMALLOC_FRAMES)")
+
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            logger.info(f"Wrote memory report to {path}")
+            return path
+        except OSError as e:
+            logger.warning(f"Failed to write memory report {path}: {e}")
+            return None
+
+    def _take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        self.last_diff = snapshot.compare_to(self.last_snapshot, "lineno")[:25]
+        self.last_snapshot = snapshot
+
+        if self.last_diff:
+            logger.info(
+                f"Memory rss={self.rss_mb():.0f}MB jobs={self.jobs} "
+                f"top growth: {self.last_diff[0]}"
+            )
+
+    def _on_signal(self, signum, frame):
+        self.dump()
@@ -0,0 +1,127 @@
+import cProfile
+import os
+import pstats
+import random
+import signal
+import socket
+import time
+from contextlib import contextmanager
+
+from app.utils.logger import logger
+
+
+class JobProfiler:
+    # Samples jobs with cProfile when switched on at runtime:
+    #   SET <key>:jobs N          profile the next N jobs across all workers
+    #   SET <key>:sample_rate 0.05 profile a share of jobs until reset to 0
+    #   kill -USR1 <pid>          profile the next PROFILE_SIGNAL_JOBS jobs here
+    # Without Redis only the signal is available.
+    # Sampled jobs are aggregated and written as .pstats files to PROFILE_DIR.
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.control_key = os.getenv("PROFILE_CONTROL_KEY", "worker:profile")
+        self.poll_interval = float(os.getenv("PROFILE_CONTROL_POLL_SECONDS", 5))
+        self.signal_jobs = int(os.getenv("PROFILE_SIGNAL_JOBS", 20))
+        self.dump_every = int(os.getenv("PROFILE_DUMP_EVERY", 50))
+        self.output_dir = os.getenv("PROFILE_DIR", "/tmp/worker-profiles")
+
+        self.local_jobs = 0
+        self.remote_jobs = False
+        self.sample_rate = 0.0
+        self.last_poll = 0.0
+
+        self.stats: pstats.Stats | None = None
+        self.sampled = 0
+        self.dumps = 0
+
+        signal.signal(signal.SIGUSR1, self._on_signal)
+
+    @contextmanager
+    def profile_job(self):
+        if not self._should_sample():
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._collect(profiler)
+
+    def dump(self):
+        if self.stats is None:
+            return
+
+        path = os.path.join(
+            self.output_dir,
+            f"worker-{socket.gethostname()}-{os.getpid()}-"
+            f"{int(time.time() * 1000)}-{self.dumps}.pstats",
+        )
+        self.dumps += 1
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.stats.dump_stats(path)
+            logger.info(f"Wrote profile of {self.sampled} jobs to {path}")
+        except OSError as e:
+            logger.warning(f"Failed to write profile {path}: {e}")
+
+        self.stats = None
+        self.sampled = 0
+
+    def _on_signal(self, signum, frame):
+        self.local_jobs = self.signal_jobs
+
+    def _should_sample(self) -> bool:
+        self._refresh_control()
+
+        if self.local_jobs > 0:
+            self.local_jobs -= 1
+            return True
+
+        if self.remote_jobs:
+            try:
+                if self.redis.decr(f"{self.control_key}:jobs") >= 0:
+                    return True
+            except Exception as e:
+                logger.warning(f"Profile control unavailable: {e}")
+            self.remote_jobs = False
+
+        if self.sample_rate > 0:
+            # Still sampling; _collect flushes every PROFILE_DUMP_EVERY jobs
+            return random.random() < self.sample_rate
+
+        # Sampling window closed: flush whatever was collected
+        self.dump()
+        return False
+
+    def _refresh_control(self):
+        if self.redis is None:
+            return
+
+        now = time.time()
+        if now - self.last_poll < self.poll_interval:
+            return
+        self.last_poll = now
+
+        try:
+            jobs, rate = self.redis.mget(
+                f"{self.control_key}:jobs",
+                f"{self.control_key}:sample_rate",
+            )
+            self.remote_jobs = int(jobs or 0) > 0
+            self.sample_rate = float(rate or 0)
+        except Exception as e:
+            logger.warning(f"Profile control unavailable: {e}")
+
+    def _collect(self, profiler: cProfile.Profile):
+        if self.stats is None:
+            self.stats = pstats.Stats(profiler)
+        else:
+            self.stats.add(profiler)
+
+        self.sampled += 1
+        if self.sampled >= self.dump_every:
+            self.dump()
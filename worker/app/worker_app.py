@@ -1,11 +1,21 @@
-import json
 import time
 import os
+import socket
+import threading
 
-from app.config.redis import get_redis_client
+from app.config.db import check_db_ready, is_db_unavailable
+from app.config.redis import get_optional_redis_client, get_redis_client
+from app.queues.base import JobQueue
+from app.queues.postgres_queue import PostgresJobQueue
+from app.queues.redis_queue import RedisJobQueue
+from app.replay.recorder import TrafficRecorder
 from app.services.document_processor import DocumentProcessor
+from app.services.result_spool import ResultSpool
 from app.repositories.audit_repo import AuditRepository
+from app.utils import db_metrics
 from app.utils.logger import logger
+from app.utils.memory_watchdog import MemoryWatchdog
+from app.utils.profiler import JobProfiler
 from app.utils.constants import AuditAction
 from app.repositories.processing_jobs_repo import ProcessingJobsRepository
 from app.repositories.dead_letter_jobs_repo import DeadLetterJobsRepository
@@ -14,9 +24,12 @@ import uuid
 
 
 class WorkerApp:
-    def __init__(self):
-        self.redis = get_redis_client()
-        self.processor = DocumentProcessor()
+    def __init__(self, worker_id: str | None = None):
+        self.worker_id = worker_id or os.getenv("WORKER_ID", socket.gethostname())
+        self.redis = get_optional_redis_client()
+        self.recorder = TrafficRecorder.from_env()
+        self.spool = ResultSpool.from_env(self.worker_id)
+        self.processor = DocumentProcessor(recorder=self.recorder, spool=self.spool)
         self.audit_repo = AuditRepository()
         self.processing_repo = ProcessingJobsRepository()
         self.dead_letter_repo = DeadLetterJobsRepository()
@@ -24,80 +37,262 @@ class WorkerApp:
         self.queue = os.getenv("QUEUE_NAME", "document_processing_queue")
         self.dlq = os.getenv("DLQ_NAME", "document_processing_dlq")
         self.max_retries = int(os.getenv("MAX_JOB_RETRIES", 3))
+        self.poll_interval = float(os.getenv("QUEUE_POLL_INTERVAL_SECONDS", 0.5))
+        self.coalesce_window = int(os.getenv("COALESCE_WINDOW_MS", 200)) / 1000
+        self.coalesce_max_jobs = int(os.getenv("COALESCE_MAX_JOBS", 50))
+        self.spool_drain_interval = float(os.getenv("RESULT_SPOOL_DRAIN_SECONDS", 5))
+        self.spool_drain_batch = int(os.getenv("RESULT_SPOOL_DRAIN_BATCH", 200))
+
+        self.profiler = JobProfiler(self.redis)
+        self.watchdog = MemoryWatchdog()
+
+        self.job_queue = self.create_job_queue(os.getenv("QUEUE_BACKEND", "redis"))
+        # Popped jobs whose receipt has not been acked, requeued or
+        # dead-lettered yet
+        self.in_flight: list[tuple[dict, object]] = []
+
+    def create_job_queue(self, backend: str) -> JobQueue:
+        if backend == "postgres":
+            return PostgresJobQueue(
+                self.worker_id,
+                claim_batch=self.coalesce_max_jobs,
+            )
+
+        return RedisJobQueue(
+            get_redis_client(decode_responses=False),
+            queue=self.queue,
+            dlq=self.dlq,
+            worker_id=self.worker_id,
+        )
+
+    def warm(self):
+        # Opens this process's Redis and pooled Postgres connections up front
+        if self.redis:
+            self.redis.ping()
+        check_db_ready()
 
     def consume(self):
         logger.info("🚀 Worker started")
+        self.job_queue.recover()
+
+        if self.spool is not None:
+            threading.Thread(
+                target=self.drain_spool, name="spool-drain", daemon=True
+            ).start()
 
         while True:
             try:
-                _, payload = self.redis.brpop(self.queue)
-                job = json.loads(payload)
-                self.handle_job(job)
+                popped = self.job_queue.pop(self.poll_interval)
+                if popped is None:
+                    continue
+
+                # The first document's deadline runs from here, coalescing included
+                started_at = time.monotonic()
+                self.in_flight = [popped]
+                batch = self.collect_batch(popped)
+                self.handle_batch(batch, started_at)
+                if self.recorder:
+                    self.recorder.clear()
+                self.watchdog.after_jobs(len(batch))
             except Exception as e:
                 logger.critical(f"Worker loop error: {e}")
+                self.return_in_flight(e)
                 time.sleep(2)
 
-    def handle_job(self, job: dict):
-        attempt = job.get("attempt", 1)
-        document_id = job.get("document_id")
-        pa_request_id = job.get("pa_request_id")
+            # Retire between batches, with nothing left in-flight, and let
+            # the supervisor start a fresh process
+            reason = self.watchdog.retire_reason()
+            if reason:
+                logger.warning(f"Worker retiring: {reason}")
+                return
 
-        logger.info(
-            f"Processing document={document_id}, attempt={attempt}"
-        )
+    def return_in_flight(self, error: Exception):
+        # Jobs left unsettled by a failed batch go back on the queue now;
+        # otherwise they would sit in this worker's in-flight list (or stay
+        # claimed by it) until the process restarts. Nothing ran against
+        # the database while it is unreachable, so those are handed back
+        # without counting an attempt.
+        entries, self.in_flight = self.in_flight, []
+        for job, receipt in entries:
+            try:
+                if is_db_unavailable(error):
+                    self.job_queue.release(receipt, job)
+                else:
+                    self.job_queue.requeue(receipt, job)
+            except Exception as e:
+                logger.error(
+                    f"Failed to return document={job.get('document_id')} "
+                    f"to the queue: {e}"
+                )
 
-        job_uuid = job.get("job_uuid") or str(uuid.uuid4())
-        job["job_uuid"] = job_uuid
+    def settle(self, receipt):
+        self.in_flight = [
+            entry for entry in self.in_flight if entry[1] is not receipt
+        ]
 
-        
-        logger.info(f"Upserting processing job for document {document_id}, attempt {attempt}")
-        self.processing_repo.upsert_processing(
-            job_uuid=job_uuid,
-            document_id=document_id,
-            status="processing",
-            attempt_count=attempt,
-        )
+    def drain_spool(self):
+        # Runs in the background for the life of the process
+        while True:
+            time.sleep(self.spool_drain_interval)
+            for spool in self.spool.spools():
+                try:
+                    with spool.drain_lock() as locked:
+                        while locked and spool.count():
+                            drained = self.processor.drain_spool(spool, self.spool_drain_batch)
+                            if not drained:
+                                break
+                            logger.info(f"Replayed {drained} spooled results from {spool.path}")
+                except Exception as e:
+                    if is_db_unavailable(e):
+                        logger.warning(f"Database still unavailable, results remain in {spool.path}")
+                        break
+                    logger.error(f"Spool drain error for {spool.path}: {e}")
 
-        try:
-            self.processor.process(job)
+    def collect_batch(self, first: tuple[dict, object]) -> list[tuple[dict, object]]:
+        # Debounce: keep pulling jobs for a short window so uploads that
+        # arrive together for one PA request are evaluated together. A job
+        # for another PA request is handed straight back for an idle worker
+        # rather than waiting behind this group.
+        self.note_arrival(first)
+        batch = [first]
+        pa_request_id = first[0].get("pa_request_id")
+        deadline = time.time() + self.coalesce_window
+
+        while len(batch) < self.coalesce_max_jobs:
+            popped = self.job_queue.pop()
+            if popped is not None:
+                if popped[0].get("pa_request_id") != pa_request_id:
+                    self.job_queue.release(popped[1], popped[0])
+                    break
+                self.note_arrival(popped)
+                batch.append(popped)
+                self.in_flight.append(popped)
+                continue
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.01))
+
+        return batch
 
+    def note_arrival(self, popped: tuple[dict, object]):
+        if self.recorder:
+            self.recorder.arrived(popped[0])
+
+    def handle_batch(
+        self, batch: list[tuple[dict, object]], started_at: float | None = None
+    ):
+        groups: dict[int, list[tuple[dict, object]]] = {}
+        for job, receipt in batch:
+            groups.setdefault(job.get("pa_request_id"), []).append((job, receipt))
+
+        if len(batch) > 1:
+            logger.info(
+                f"Coalesced {len(batch)} jobs into {len(groups)} PA request groups"
+            )
+
+        for entries in groups.values():
+            self.handle_group(entries, started_at)
+
+    def handle_job(self, job: dict, receipt):
+        self.handle_group([(job, receipt)])
+
+    def handle_group(
+        self, entries: list[tuple[dict, object]], started_at: float | None = None
+    ):
+        # Attributes every statement, including queue and retry
+        # bookkeeping, to this group
+        with db_metrics.job_scope(len(entries)):
+            self.run_group(entries, started_at)
+
+    def run_group(
+        self, entries: list[tuple[dict, object]], started_at: float | None = None
+    ):
+        for job, _ in entries:
+            attempt = job.get("attempt", 1)
+            document_id = job.get("document_id")
+
+            logger.info(
+                f"Processing document={document_id}, attempt={attempt}"
+            )
+
+            job_uuid = job.get("job_uuid") or str(uuid.uuid4())
+            job["job_uuid"] = job_uuid
+
+            logger.info(f"Upserting processing job for document {document_id}, attempt {attempt}")
             self.processing_repo.upsert_processing(
                 job_uuid=job_uuid,
                 document_id=document_id,
-                status="success",
+                status="processing",
                 attempt_count=attempt,
             )
 
+        try:
+            with self.profiler.profile_job():
+                failures = self.processor.process_group(
+                    [job for job, _ in entries], started_at
+                )
         except Exception as e:
+            failures = {job["job_uuid"]: e for job, _ in entries}
+
+        for job, receipt in entries:
+            attempt = job.get("attempt", 1)
+            document_id = job.get("document_id")
+            error = failures.get(job["job_uuid"])
+
+            if error is None:
+                try:
+                    self.processing_repo.upsert_processing(
+                        job_uuid=job["job_uuid"],
+                        document_id=document_id,
+                        status="success",
+                        attempt_count=attempt,
+                    )
+                except Exception as e:
+                    if self.spool is None or not is_db_unavailable(e):
+                        raise
+                    # Results are committed or spooled; the drain marks the
+                    # processing job successful when it replays them
+                    logger.warning(f"Skipped success status for document={document_id}: {e}")
+                self.job_queue.ack(receipt)
+                self.settle(receipt)
+                continue
+
             logger.error(
                 f"Error processing document={document_id}, "
-                f"attempt={attempt}, error={e}"
+                f"attempt={attempt}, error={error}"
+            )
+            self.retry_or_dlq(
+                job, receipt, attempt, document_id, job.get("pa_request_id"), error
             )
-            self.retry_or_dlq(job, attempt, document_id, pa_request_id, e)
 
     def retry_or_dlq(
         self,
         job: dict,
+        receipt,
         attempt: int,
         document_id: int,
         pa_request_id: int,
         error: Exception,
     ):
         if attempt >= self.max_retries:
-            self.send_to_dlq(job, document_id, pa_request_id, error)
+            self.send_to_dlq(job, receipt, document_id, pa_request_id, error)
         else:
-            self.retry_job(job, attempt, document_id, pa_request_id)
+            self.retry_job(job, receipt, attempt, document_id, pa_request_id)
 
+    # Queue transitions run first as a single atomic script; the database
+    # bookkeeping after them is idempotent so a crash in between is safe.
     def retry_job(
         self,
         job: dict,
+        receipt,
         attempt: int,
         document_id: int,
         pa_request_id: int,
     ):
-        job["attempt"] = attempt + 1
-        self.redis.lpush(self.queue, json.dumps(job))
-
+        self.job_queue.requeue(receipt, job)
+        self.settle(receipt)
 
         self.processing_repo.upsert_processing(
             job_uuid=job["job_uuid"],
@@ -123,20 +318,13 @@ class WorkerApp:
     def send_to_dlq(
         self,
         job: dict,
+        receipt,
         document_id: int,
         pa_request_id: int,
         error: Exception,
     ):
-        self.redis.lpush(
-            self.dlq,
-            json.dumps(
-                {
-                    **job,
-                    "error": str(error),
-                    "failed_at": time.time(),
-                }
-            ),
-        )
+        self.job_queue.dead_letter(receipt, job, str(error))
+        self.settle(receipt)
 
         self.audit_repo.log(
             pa_request_id=pa_request_id,